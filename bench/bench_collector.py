@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+bench_collector.py — end-to-end collector benchmark without network access.
+
+Recorded (or synthetic) t.me/s/ pages and subscription bodies are served by a
+local http.server stand-in; collector.TELEGRAM_BASE is pointed at it.  Each
+size then runs the real pipeline stages:
+
+  fetch      fetch_all_sources() over every channel and subscription URL
+             (concurrent, per-host limits, as in a collector run)
+  clean      clean_configs() on the merged Collected stream
+  write      write_subscription() + write_endpoints() into a temp output/
+
+and prints one JSON document: per stage seconds, bytes and configs, overall
+configs/second and peak RSS.  Every size runs in its own process so peak RSS
+is per size.
+
+Usage:
+  python3 bench/bench_collector.py                          # 1k, 10k, 100k configs
+  python3 bench/bench_collector.py --sizes 5000,50000
+  python3 bench/bench_collector.py --record DIR             # also save the fixtures per size
+  python3 bench/bench_collector.py --fixtures DIR           # serve saved fixtures instead
+
+A fixtures directory holds tme/<channel>.html (a saved t.me/s/ page) and
+subs/<name> (a subscription body, base64 or plain).
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import glob
+import html
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import collector  # noqa: E402
+from bench_extractor import BUBBLE_TAIL, HEAD  # noqa: E402
+from output_writer import EndpointGroups, write_endpoints, write_subscription  # noqa: E402
+
+TELEGRAM_SHARE = 0.3     # fraction of configs posted in channels, the rest come from subscriptions
+CONFIGS_PER_PAGE = 100   # 20 messages of 5 configs, like a busy channel
+SUB_CONFIGS = 5000       # configs per subscription body
+DUPLICATE_SHARE = 0.1    # configs posted both in a channel and a subscription
+
+
+def synth_configs(n, rng):
+    """`n` distinct configs over a few hundred hosts (mostly vless, some trojan / vmess)."""
+    hosts = [f"cdn{i}.example{i % 7}.com" for i in range(max(1, n // 50))]
+    out = []
+    for i in range(n):
+        host = hosts[i % len(hosts)]
+        uid = "%08x-%04x-4%03x-a%03x-%012x" % (rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(12),
+                                               rng.getrandbits(12), rng.getrandbits(48))
+        kind = i % 10
+        if kind < 7:
+            out.append(f"vless://{uid}@{host}:443?encryption=none&security=tls&sni={host}&type=ws"
+                       f"&host={host}&path=%2Fws{i % 13}#%F0%9F%87%A9%F0%9F%87%AA%20cfg-{i}")
+        elif kind < 9:
+            out.append(f"trojan://{uid}@{host}:2096?security=tls&sni={host}&type=grpc&serviceName=g#cfg-{i}")
+        else:
+            obj = {"v": "2", "ps": f"cfg-{i}", "add": host, "port": "8443", "id": uid, "aid": "0",
+                   "net": "ws", "type": "none", "host": host, "path": "/", "tls": "tls"}
+            out.append("vmess://" + base64.b64encode(json.dumps(obj).encode()).decode())
+    return out
+
+
+def synth_page(channel, configs):
+    """A t.me/s/-shaped page carrying exactly `configs`, 5 per message."""
+    now = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+    parts = [f"<html><head>{HEAD}</head><body>"]
+    for i in range(0, len(configs), 5):
+        body = "<br/>".join(html.escape(c) for c in configs[i:i + 5])
+        msg_id = 1000 + i // 5
+        parts.append(
+            '<div class="tgme_widget_message_wrap js-widget_message_wrap">'
+            f'<div class="tgme_widget_message js-widget_message" data-post="{channel}/{msg_id}">'
+            f'<div class="tgme_widget_message_bubble">{BUBBLE_TAIL}'
+            f'<div class="tgme_widget_message_text js-message_text" dir="auto">{body}</div>'
+            '<div class="tgme_widget_message_footer compact js-message_footer">'
+            f'<a class="tgme_widget_message_date" href="https://t.me/{channel}/{msg_id}">'
+            f'<time datetime="{now}" class="time">00:00</time></a></div>'
+            "</div></div></div>"
+        )
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def synth_fixtures(size, seed):
+    """{"tme": {channel: page bytes}, "subs": {name: body bytes}} for about `size` configs."""
+    rng = random.Random(seed)
+    configs = synth_configs(size, rng)
+    n_tg = int(size * TELEGRAM_SHARE)
+    tg, subs = configs[:n_tg], configs[n_tg:]
+    # some channel posts repeat subscription configs, as they do in practice
+    dup = subs[:int(len(tg) * DUPLICATE_SHARE)]
+    tg = tg[:len(tg) - len(dup)] + dup
+    rng.shuffle(tg)
+    tme = {f"chan{i:04d}": synth_page(f"chan{i:04d}", tg[i:i + CONFIGS_PER_PAGE]).encode()
+           for i in range(0, len(tg), CONFIGS_PER_PAGE)}
+    bodies = {}
+    for i in range(0, len(subs), SUB_CONFIGS):
+        text = "\n".join(subs[i:i + SUB_CONFIGS]).encode()
+        bodies[f"sub{i // SUB_CONFIGS:03d}"] = base64.b64encode(text) if i // SUB_CONFIGS % 2 == 0 else text
+    return {"tme": tme, "subs": bodies}
+
+
+def load_fixtures(path):
+    fixtures = {"tme": {}, "subs": {}}
+    for kind in fixtures:
+        for name in sorted(glob.glob(os.path.join(path, kind, "*"))):
+            with open(name, "rb") as f:
+                key = os.path.basename(name)
+                fixtures[kind][key[:-5] if kind == "tme" and key.endswith(".html") else key] = f.read()
+    return fixtures
+
+
+def save_fixtures(fixtures, path):
+    for kind, files in fixtures.items():
+        os.makedirs(os.path.join(path, kind), exist_ok=True)
+        for name, body in files.items():
+            with open(os.path.join(path, kind, f"{name}.html" if kind == "tme" else name), "wb") as f:
+                f.write(body)
+
+
+def serve(fixtures):
+    """Start the stand-in server on a free local port; returns (server, base URL)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # keep-alive responses are not held back by delayed ACKs
+
+        def do_GET(self):
+            kind, _, name = self.path.lstrip("/").partition("/")
+            body = fixtures.get(kind, {}).get(name.split("?", 1)[0])
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8" if kind == "tme" else "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_size(fixtures):
+    """Run the pipeline stages against `fixtures`; returns the result dict."""
+    server, base = serve(fixtures)
+    collector.TELEGRAM_BASE = f"{base}/tme/"
+    session = collector.make_session()
+    stages = {}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    sub_urls = [f"{base}/subs/{name}" for name in fixtures["subs"]]
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet:
+            t0 = time.perf_counter()
+            results = asyncio.run(collector.fetch_all_sources(list(fixtures["tme"]), sub_urls, session=session))
+            raw = sum(len(c) for _, c in results)
+            stages["fetch"] = {"seconds": time.perf_counter() - t0,
+                               "bytes": sum(len(b) for files in fixtures.values() for b in files.values()),
+                               "sources": len(results), "configs": raw}
+
+            t0 = time.perf_counter()
+            cleaned = collector.clean_configs(list(collector.iter_collected(results)))
+            stages["clean"] = {"seconds": time.perf_counter() - t0, "configs": len(cleaned)}
+
+            t0 = time.perf_counter()
+            out_dir = os.path.join(tmp, "output")
+            endpoints = EndpointGroups()
+            count, _ = write_subscription(endpoints.collect(c.uri for c in cleaned), out_dir)
+            groups = write_endpoints(endpoints, out_dir)
+            stages["write"] = {"seconds": time.perf_counter() - t0, "configs": count, "endpoints": groups,
+                               "bytes": os.path.getsize(os.path.join(out_dir, "sub.txt"))}
+    collector.shutdown_parse_pool()
+    server.shutdown()
+
+    total = sum(s["seconds"] for s in stages.values())
+    for s in stages.values():
+        s["seconds"] = round(s["seconds"], 4)
+    return {
+        "raw_configs": raw,
+        "unique_configs": stages["write"]["configs"],
+        "channels": len(fixtures["tme"]),
+        "subscriptions": len(fixtures["subs"]),
+        "seconds": round(total, 4),
+        "configs_per_second": round(raw / total) if total > 0 else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages": stages,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark the collector pipeline against a local HTTP stand-in")
+    p.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated config counts")
+    p.add_argument("--fixtures", help="Serve saved fixtures from this directory instead of synthetic ones")
+    p.add_argument("--record", help="Save each size's synthetic fixtures under this directory")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--one", help=argparse.SUPPRESS)  # child process: one size (or "fixtures")
+    args = p.parse_args()
+
+    if args.one:
+        if args.one == "fixtures":
+            fixtures = load_fixtures(args.fixtures)
+        else:
+            fixtures = synth_fixtures(int(args.one), args.seed)
+            if args.record:
+                save_fixtures(fixtures, os.path.join(args.record, args.one))
+        result = run_size(fixtures)
+        result["size"] = args.one
+        print(json.dumps(result))
+        return
+
+    runs = ["fixtures"] if args.fixtures else [s.strip() for s in args.sizes.split(",") if s.strip()]
+    results = []
+    for run in runs:
+        cmd = [sys.executable, os.path.abspath(__file__), "--one", run, "--seed", str(args.seed)]
+        for flag in ("fixtures", "record"):
+            if getattr(args, flag):
+                cmd += [f"--{flag}", getattr(args, flag)]
+        out = subprocess.run(cmd, capture_output=True, text=True, cwd=REPO_ROOT)
+        if out.returncode != 0:
+            print(out.stderr, file=sys.stderr)
+            sys.exit(out.returncode)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    print(json.dumps({"python": sys.version.split()[0], "cpus": os.cpu_count(), "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
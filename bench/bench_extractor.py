@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+bench_extractor.py — micro-benchmark: extractor.extract_configs vs the old
+per-protocol regex loop from collector.fetch_from_telegram, and whole-page
+scanning (html.unescape + extract_configs) vs TelegramPageParser, which only
+scans message bodies.
+
+"speedup" is measured on message text, the input extract_configs gets in
+a collector run.  On whole pages (mostly markup, few candidates) the single
+alternation is no faster than the old loop; "whole_page_speedup" shows it.
+"message_parser_speedup" is whole-page scanning over TelegramPageParser +
+extract_configs, both timed from the raw page.
+
+Usage:
+  python3 bench/bench_extractor.py                    # synthetic t.me/s/ pages
+  python3 bench/bench_extractor.py --pages DIR        # saved pages (*.html)
+  python3 bench/bench_extractor.py --save DIR         # write the synthetic pages to DIR
+"""
+
+import argparse
+import base64
+import glob
+import html
+import json
+import os
+import random
+import re
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from extractor import PROTOCOLS, extract_configs, parse_telegram_page  # noqa: E402
+
+
+def legacy_extract(text):
+    """The extraction loop collector.py used before extractor.py."""
+    configs = []
+    for protocol in PROTOCOLS:
+        pattern = re.escape(protocol) + r'[^\s<>"\'\n]+'
+        for config in re.findall(pattern, text):
+            configs.append(config.rstrip(',;.'))
+    for block in re.findall(r'[A-Za-z0-9+/=]{80,}', text):
+        try:
+            missing_padding = len(block) % 4
+            if missing_padding:
+                block += '=' * (4 - missing_padding)
+            decoded = base64.b64decode(block).decode("utf-8", errors="ignore")
+            for line in decoded.splitlines():
+                line = line.strip()
+                if any(line.startswith(p) for p in PROTOCOLS):
+                    configs.append(line)
+        except Exception:
+            pass
+    return configs
+
+
+def page_extract(raw):
+    """Whole-page path: unescape everything, then scan everything."""
+    return extract_configs(html.unescape(raw))
+
+
+def message_extract(raw):
+    """Message-text path used by collector.fetch_from_telegram."""
+    return [c for msg in parse_telegram_page(raw) for c in extract_configs(msg.text)]
+
+
+def _sample_configs():
+    path = os.path.join(REPO_ROOT, "output", "sub.txt")
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [ln.strip() for ln in f if "://" in ln]
+    except OSError:
+        lines = []
+    return lines or [
+        f"vless://{random.randbytes(16).hex()}@host{i}.example.com:443?security=tls&type=ws#cfg-{i}"
+        for i in range(200)
+    ]
+
+
+HEAD = (
+    '<meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">'
+    + "".join(f'<link href="//telegram.org/css/widget-frame.css?{i}" rel="stylesheet">' for i in range(30))
+    + "<script>var TWidget=" + json.dumps({"k%d" % i: "x" * 40 for i in range(200)}) + ";</script>"
+    + "<style>" + ".tgme_widget_message_bubble{margin:0 0 0 10px}" * 120 + "</style>"
+)
+BUBBLE_TAIL = ('<i class="tgme_widget_message_bubble_tail"><svg class="bubble_icon" width="9px" height="20px" '
+               'viewBox="0 0 9 20"><g fill="none"><path class="background" fill="#ffffff" d="M8,1 L9,1 L9,20 '
+               'L8,20 L8,18 C7.807,15.161 7.124,12.233 5.950,9.218 C5.046,6.893 3.504,4.733 1.325,2.738 '
+               'L1.325,2.738 C0.917,2.365 0.89,1.732 1.263,1.325 C1.452,1.118 1.72,1 2,1 L8,1 Z"></path>'
+               '</g></svg></i>')
+
+
+def synth_page(channel, first_id, configs, rng, messages=20):
+    """A t.me/s/-shaped page: head scripts/CSS, per-message chrome (author,
+    bubble SVG, reply quotes, link previews, footer) and message bodies."""
+    parts = [f"<html><head>{HEAD}</head><body>"]
+    for i in range(messages):
+        picked = rng.sample(configs, min(len(configs), rng.randint(1, 6)))
+        body = "<br/>".join(html.escape(c) for c in picked)
+        if rng.random() < 0.3:
+            blob = base64.b64encode("\n".join(rng.sample(configs, min(len(configs), 10))).encode()).decode()
+            body += f"<br/><code>{blob}</code>"
+        if rng.random() < 0.5:
+            body += f"<br/>vmess://{base64.b64encode(json.dumps({'add': 'x.com', 'port': 443, 'id': 'u' * 36, 'ps': 'z' * 40}).encode()).decode()}"
+        reply = ""
+        if rng.random() < 0.2:
+            # truncated quote of an earlier post
+            reply = ('<a class="tgme_widget_message_reply" href="https://t.me/x/1"><div class="tgme_widget_message_author">'
+                     '<span class="tgme_widget_message_author_name">x</span></div>'
+                     f'<div class="tgme_widget_message_text js-message_reply_text">{html.escape(picked[0][:60])}</div></a>')
+        preview = ""
+        if rng.random() < 0.2:
+            preview = ('<a class="tgme_widget_message_link_preview" href="https://example.com/">'
+                       '<div class="link_preview_site_name">example</div>'
+                       '<div class="link_preview_description">vless://preview@example.com:443 in a page description</div></a>')
+        parts.append(
+            '<div class="tgme_widget_message_wrap js-widget_message_wrap">'
+            f'<div class="tgme_widget_message text_not_supported_wrap js-widget_message" data-post="{channel}/{first_id + i}">'
+            f'<div class="tgme_widget_message_user"><a href="https://t.me/{channel}"><i class="tgme_widget_message_user_photo">'
+            f'<img src="https://cdn4.telesco.pe/file/{rng.randbytes(60).hex()}.jpg"></i></a></div>'
+            f'<div class="tgme_widget_message_bubble">{BUBBLE_TAIL}'
+            f'<div class="tgme_widget_message_author accent_color"><a class="tgme_widget_message_owner_name" '
+            f'href="https://t.me/{channel}"><span dir="auto">{channel}</span></a></div>{reply}'
+            f'<div class="tgme_widget_message_text js-message_text" dir="auto">{body}</div>{preview}'
+            '<div class="tgme_widget_message_footer compact js-message_footer"><div class="tgme_widget_message_info short js-message_info">'
+            '<span class="tgme_widget_message_views">1.2K</span><span class="copyonly"> views</span>'
+            f'<span class="tgme_widget_message_meta"><a class="tgme_widget_message_date" href="https://t.me/{channel}/{first_id + i}">'
+            '<time datetime="2026-01-01T00:00:00+00:00" class="time">00:00</time></a></span></div></div>'
+            "</div></div></div>"
+        )
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def load_pages(args):
+    if args.pages:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.pages, "*.html"))):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+        return pages
+    rng = random.Random(args.seed)
+    configs = _sample_configs()
+    pages = [synth_page(f"chan{i}", 1000 * i, configs, rng) for i in range(args.count)]
+    if args.save:
+        os.makedirs(args.save, exist_ok=True)
+        for i, page in enumerate(pages):
+            with open(os.path.join(args.save, f"page_{i:03d}.html"), "w", encoding="utf-8") as f:
+                f.write(page)
+    return pages
+
+
+def _time(func, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for page in pages:
+            func(page)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark config extraction on Telegram pages")
+    p.add_argument("--pages", help="Directory of saved t.me/s/ pages (*.html)")
+    p.add_argument("--save", help="Write synthetic pages to this directory")
+    p.add_argument("--count", type=int, default=40, help="Synthetic pages to generate")
+    p.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is kept)")
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args()
+
+    raw_pages = load_pages(args)
+    if not raw_pages:
+        print("No pages to benchmark.")
+        return
+    pages = [html.unescape(pg) for pg in raw_pages]
+    texts = [msg.text for pg in raw_pages for msg in parse_telegram_page(pg)]
+    size_mb = sum(len(pg) for pg in raw_pages) / 1e6
+
+    old = _time(legacy_extract, texts, args.repeat)
+    new = _time(extract_configs, texts, args.repeat)
+    old_page = _time(legacy_extract, pages, args.repeat)
+    new_page = _time(extract_configs, pages, args.repeat)
+
+    old_set = {c for t in texts for c in legacy_extract(t)}
+    new_set = {c for t in texts for c in extract_configs(t)}
+    # the old loop also matched "ss://..." inside every "vless://..." / "vmess://..."
+    phantom = {c for c in old_set - new_set
+               if c.startswith("ss://") and ("vle" + c in old_set or "vme" + c in old_set)}
+
+    whole = _time(page_extract, raw_pages, args.repeat)
+    parsed = _time(message_extract, raw_pages, args.repeat)
+    page_set = {c for pg in raw_pages for c in page_extract(pg)}
+    message_set = {c for pg in raw_pages for c in message_extract(pg)}
+
+    print(json.dumps({
+        "pages": len(pages),
+        "megabytes": round(size_mb, 2),
+        "messages": len(texts),
+        "legacy_seconds": round(old, 4),
+        "extractor_seconds": round(new, 4),
+        "speedup": round(old / new, 2) if new > 0 else None,
+        "whole_page_speedup": round(old_page / new_page, 2) if new_page > 0 else None,
+        "legacy_configs": len(old_set),
+        "extractor_configs": len(new_set),
+        "phantom_ss_dropped": len(phantom),
+        "missing": len(old_set - new_set - phantom),
+        "whole_page_seconds": round(whole, 4),
+        "message_parser_seconds": round(parsed, 4),
+        "message_parser_speedup": round(whole / parsed, 2) if parsed > 0 else None,
+        "whole_page_configs": len(page_set),
+        "message_parser_configs": len(message_set),
+        "outside_messages": len(page_set - message_set),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
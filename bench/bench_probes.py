@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+bench_probes.py — probes per second with a fresh SSLContext per probe (the
+old behaviour) vs scanner.ssl_context()'s shared contexts.
+
+Two measurements:
+  context   building the client context alone (what every probe used to pay)
+  probe     scanner._tls_probe() against a local TLS server, so the handshake
+            and socket work are included; needs `openssl` on PATH to make a
+            throw-away certificate (or pass --cert / --key)
+
+Usage:
+  python3 bench/bench_probes.py
+  python3 bench/bench_probes.py --probes 2000 --workers 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import scanner  # noqa: E402
+
+
+def fresh_context(verify=False, alpn=()):
+    """What each probe did before scanner.ssl_context()."""
+    ctx = ssl.create_default_context()
+    if not verify:
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    if alpn:
+        ctx.set_alpn_protocols(list(alpn))
+    return ctx
+
+
+def bench_contexts(n):
+    out = {}
+    for name, make in (("fresh", fresh_context), ("shared", scanner.ssl_context)):
+        make()
+        t0 = time.perf_counter()
+        for _ in range(n):
+            make()
+        out[name] = round(n / (time.perf_counter() - t0))
+    return out
+
+
+def make_cert(tmp):
+    if not shutil.which("openssl"):
+        return None
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+                    "-nodes", "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=localhost"],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+async def bench_probes(cert, key, n, workers):
+    sctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    sctx.load_cert_chain(cert, key)
+
+    async def handle(r, w):
+        w.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0, ssl=sctx)
+    port = server.sockets[0].getsockname()[1]
+    sem = asyncio.Semaphore(workers)
+
+    async def one():
+        async with sem:
+            return await scanner._tls_probe("127.0.0.1", "localhost", 5, validate=False, port=port)
+
+    out = {}
+    shared = scanner.ssl_context
+    try:
+        for name, make in (("fresh", fresh_context), ("shared", shared)):
+            scanner.ssl_context = make
+            await asyncio.gather(*[one() for _ in range(min(n, 50))])  # warm up
+            t0 = time.perf_counter()
+            results = await asyncio.gather(*[one() for _ in range(n)])
+            elapsed = time.perf_counter() - t0
+            out[name] = round(n / elapsed)
+            out[f"{name}_failed"] = sum(1 for r in results if r[0] < 0)
+    finally:
+        scanner.ssl_context = shared
+        server.close()
+        await server.wait_closed()
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark TLS probe throughput with fresh vs shared SSLContexts")
+    p.add_argument("--contexts", type=int, default=300, help="Contexts to build in the context benchmark")
+    p.add_argument("--probes", type=int, default=500, help="Probes per variant against the local server")
+    p.add_argument("--workers", type=int, default=50, help="Concurrent probes")
+    p.add_argument("--cert", help="PEM certificate for the local server")
+    p.add_argument("--key", help="PEM private key for the local server")
+    args = p.parse_args()
+
+    report = {"contexts_per_second": bench_contexts(args.contexts)}
+    with tempfile.TemporaryDirectory() as tmp:
+        pair = (args.cert, args.key) if args.cert and args.key else make_cert(tmp)
+        if pair:
+            report["probes_per_second"] = asyncio.run(bench_probes(*pair, args.probes, args.workers))
+        else:
+            report["probes_per_second"] = "skipped: no openssl on PATH and no --cert/--key"
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
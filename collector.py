@@ -1,11 +1,37 @@
+import argparse
 import requests
-import re
 import base64
 import os
 import subprocess
 import sys
 import html
 import datetime
+import asyncio
+import codecs
+import copy
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+import time
+import urllib.parse
+from collections import Counter, deque
+from typing import NamedTuple
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from extractor import TelegramPageParser, extract_configs, has_protocol, parse_config_lines
+from identity import canonical_key
+from config_index import ConfigIndex
+from dead_filter import DeadFilter
+from discovery import Frontier, find_references
+from output_writer import (EndpointGroups, file_sha256, publish_delta, write_endpoints, write_json_atomic,
+                           write_subscription)
+from run_report import PollSchedule, SourceHistory, SourceStats, write_report
+from validator import ConfigValidator, check_config
 
 CHANNELS = [
     "ShadowProxy66",
@@ -14,120 +40,557 @@ CHANNELS = [
     "IR_NETLIFY_GAP",
 ]
 
-PROTOCOLS = ["vmess://", "vless://", "trojan://", "ss://", "ssr://", "hysteria2://", "hy2://", "tuic://"]
+TELEGRAM_BASE = "https://t.me/s/"  # channel previews; bench/ points this at a local server
+TELEGRAM_TIMEOUT = 20   # seconds per t.me request
+SUB_TIMEOUT = 15        # seconds per subscription request
+FETCH_DEADLINE = 600    # whole fetch stage must finish within this (Actions job limit is 15 min)
+RUN_BUDGET = 0          # seconds for the whole run with --budget (0 = off)
+OUTPUT_RESERVE = 60     # seconds of the run budget kept for writing outputs
+MIN_REQUEST_TIMEOUT = 2.0  # a source is not started with less time than this left
+HOST_CONCURRENCY = 4    # max parallel requests to a single host
+POOL_SIZE = 32          # keep-alive connections shared by all fetches
+PARALLEL_MIN_LINES = 5000  # bodies with fewer lines are parsed in-process
+PARSE_CHUNK_LINES = 2000   # lines per worker task for large bodies
+
+STATE_DIR = "state"
+TELEGRAM_STATE = os.path.join(STATE_DIR, "telegram.json")
+TG_KEEP_MESSAGES = 200  # newest messages (and their configs) remembered per channel
+TG_BACKFILL = 0         # seconds per channel to page back with ?before= (0 = off)
+HTTP_CACHE_STATE = os.path.join(STATE_DIR, "http_cache.json")
+HISTORY_STATE = os.path.join(STATE_DIR, "source_history.json")
+FRONTIER_STATE = os.path.join(STATE_DIR, "frontier.json")
+FOLDER_INDEX = os.path.join(STATE_DIR, "folder_index.json")  # configs/ files already scanned
+DISCOVER_BUDGET = 0     # seconds per run for fetching discovered sources (0 = off)
+DISCOVER_MAX = 20       # discovered sources fetched per run
+DAEMON_DISCOVER_EVERY = 3 * 3600  # seconds between discovery rounds in --daemon mode
+REPORT_FILE = os.path.join("output", "report.json")
+ENDPOINTS_FILE = os.path.join("output", "endpoints.json")
+REJECTS_LOG = os.path.join(STATE_DIR, "rejects.tsv")
+DEAD_FILTER = os.path.join("output", "dead.bloom")  # written by local_scan.py
+INDEX_DB = os.path.join(STATE_DIR, "index.sqlite3")
+INDEX_TTL_DAYS = 14     # forget configs not seen for this many days
+MAX_AGE_DAYS = 7        # drop configs posted longer ago than this (0 = keep all)
+TG_CHUNK_BYTES = 64 * 1024  # t.me pages are parsed as they download, in chunks of this size
+
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
 
 def normalize_config(config):
-    config = config.strip()
-    
-    if config.startswith("vmess://"):
-        try:
-            json_str = base64.b64decode(config[8:]).decode('utf-8')
-            add_match = re.search(r'"add":"(.*?)"', json_str)
-            port_match = re.search(r'"port":([^,}]+)', json_str)
-            id_match = re.search(r'"id":"(.*?)"', json_str)
-            
-            if add_match and port_match and id_match:
-                return f"vmess://{add_match.group(1)}:{port_match.group(1)}:{id_match.group(1)}"
-        except:
-            pass
-            
-    elif any(config.startswith(p) for p in ["vless://", "trojan://", "hysteria2://", "hy2://", "tuic://"]):
-        try:
-            return config.split('#')[0]
-        except:
-            pass
-
-    return config
-
-def fetch_from_telegram(channel):
-    configs = []
+    """کلید یکتای سرور برای حذف تکراری‌ها (identity.canonical_key، بدون remark و ترتیب پارامترها)"""
+    return canonical_key(config)
+
+class Collected(NamedTuple):
+    """A raw config and where it came from."""
+    uri: str
+    source: str = ""   # @channel, URL or configs/
+    key: str = ""      # canonical key, if a parse worker already computed it
+    msg_id: int = 0    # Telegram message ID
+    ts: float = 0.0    # Telegram post time (POSIX)
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+def _get_parse_pool():
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # forkserver: workers must not inherit the fetch threads' locks
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _parse_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2, mp_context=ctx)
+        return _parse_pool
+
+def shutdown_parse_pool():
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown()
+            _parse_pool = None
+
+def filter_config_lines(lines):
+    """خطوط کانفیگ یک بدنه به صورت [uri, key]؛ بدنه‌های بزرگ روی process pool پردازش می‌شوند"""
+    if len(lines) < PARALLEL_MIN_LINES or (os.cpu_count() or 1) < 2:
+        return [[uri, key] for uri, key in parse_config_lines(lines)]
+    chunks = [lines[i:i + PARSE_CHUNK_LINES] for i in range(0, len(lines), PARSE_CHUNK_LINES)]
+    try:
+        parts = list(_get_parse_pool().map(parse_config_lines, chunks))
+    except Exception as e:
+        print(f"    Parse pool unavailable ({e}), parsing in-process")
+        parts = [parse_config_lines(chunk) for chunk in chunks]
+    return [[uri, key] for part in parts for uri, key in part]
+
+def make_session():
+    """Shared HTTP session: one keep-alive pool reused by every fetch."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def load_state(path):
+    """Read a JSON state file; a missing or corrupt file means empty state."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(path, data):
+    """Write a JSON state file atomically."""
+    write_json_atomic(path, data, ensure_ascii=False, separators=(',', ':'))
+
+class DeadlineExceeded(requests.Timeout):
+    """The run's fetch deadline passed while a response was still downloading."""
+
+def _error_status(e):
+    if isinstance(e, DeadlineExceeded):
+        return "deadline"
+    return "timeout" if isinstance(e, requests.Timeout) else f"error: {type(e).__name__}"
+
+def _request_timeout(timeout, until=None):
+    """`timeout`, shortened so the request cannot outlive `until` (a time.monotonic() deadline)."""
+    if until is None:
+        return timeout
+    return max(0.1, min(timeout, until - time.monotonic()))
+
+def _check_deadline(until, url):
+    # requests' timeout bounds each socket read, not the whole body
+    if until is not None and time.monotonic() > until:
+        raise DeadlineExceeded(f"deadline reached while reading {url}")
+
+def _read_body(r, until=None, url=""):
+    """Response body, read in chunks so a slow server cannot run past `until`."""
+    if until is None:
+        return r.content
+    chunks = []
+    for chunk in r.iter_content(TG_CHUNK_BYTES):
+        chunks.append(chunk)
+        _check_deadline(until, url)
+    return b"".join(chunks)
+
+def _decode_body(r, body):
+    """What r.text gives, for a body read with _read_body()."""
+    encoding = r.encoding or requests.compat.chardet.detect(body)["encoding"] or "utf-8"
     try:
-        url = f"https://t.me/s/{channel}"
-        print(f"Fetching: {url}")
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
-        r = requests.get(url, headers=headers, timeout=20)
+        return body.decode(encoding, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+def _fetch_telegram_page(http, channel, before=None, stats=None, timeout=TELEGRAM_TIMEOUT, until=None):
+    """One t.me/s/ page as [TelegramMessage], parsed as it downloads; None on an HTTP error."""
+    url = f"{TELEGRAM_BASE}{channel}"
+    if before:
+        url += f"?before={before}"
+    print(f"Fetching: {url}")
+    t0 = time.monotonic()
+    parse_secs = 0.0
+    size = 0
+    with http.get(url, headers=BROWSER_HEADERS, timeout=_request_timeout(timeout, until), stream=True) as r:
+        if stats is not None:
+            stats.status = str(r.status_code)
         if r.status_code == 200:
-            text = r.text
-            text = html.unescape(text)
-
-            for protocol in PROTOCOLS:
-                pattern = re.escape(protocol) + r'[^\s<>"\'\n]+'
-                found = re.findall(pattern, text)
-                
-                for config in found:
-                    config = config.rstrip(',;.')
-                    configs.append(config)
-
-            b64_pattern = r'[A-Za-z0-9+/=]{80,}'
-            b64_blocks = re.findall(b64_pattern, text)
-            for block in b64_blocks:
-                try:
-                    missing_padding = len(block) % 4
-                    if missing_padding:
-                        block += '=' * (4 - missing_padding)
-
-                    decoded = base64.b64decode(block).decode("utf-8", errors="ignore")
-                    for line in decoded.splitlines():
-                        line = line.strip()
-                        if any(line.startswith(p) for p in PROTOCOLS):
-                            configs.append(line)
-                except Exception:
-                    pass
-
-            unique_in_channel = list(set(configs))
-            print(f"  Found {len(unique_in_channel)} raw configs from @{channel}")
-            return unique_in_channel
-        else:
-            print(f"  HTTP {r.status_code} for @{channel}")
+            parser = TelegramPageParser()
+            decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+            for chunk in r.iter_content(TG_CHUNK_BYTES):
+                size += len(chunk)
+                t1 = time.perf_counter()
+                parser.feed(decoder.decode(chunk))
+                parse_secs += time.perf_counter() - t1
+                _check_deadline(until, url)
+            t1 = time.perf_counter()
+            parser.feed(decoder.decode(b"", final=True))
+            parser.close()
+            parse_secs += time.perf_counter() - t1
+    if stats is not None:
+        stats.latency_s += time.monotonic() - t0 - parse_secs
+        stats.bytes += size
+        stats.scan_s += parse_secs
+    if r.status_code != 200:
+        print(f"  HTTP {r.status_code} for @{channel}")
+        return None
+    return parser.messages
+
+def _telegram_configs(channel, kept, ids):
+    """Collected records for the kept messages `ids`, newest first, each config once."""
+    seen = set()
+    out = []
+    for msg_id in ids:
+        msg = kept[str(msg_id)]
+        for c in msg["configs"]:
+            if c not in seen:
+                seen.add(c)
+                out.append(Collected(c, f"@{channel}", "", msg_id, msg["time"]))
+    return out
+
+def _note_references(refs, channel, msg):
+    if refs is not None:
+        channels, subs = find_references(msg.text, msg.links)
+        if channels or subs:
+            refs.append((f"@{channel}", channels, subs))
+
+def fetch_from_telegram(channel, session=None, cursor=None, backfill=0, stats=None,
+                        timeout=TELEGRAM_TIMEOUT, refs=None, until=None):
+    """دریافت کانفیگ‌های یک کانال تلگرام"""
+    http = session or requests
+    try:
+        messages = _fetch_telegram_page(http, channel, stats=stats, timeout=timeout, until=until)
+        if messages is None:
+            return []
+
+        if cursor is None:
+            kept = {}
+            for msg in messages:
+                entry = kept.setdefault(str(msg.id), {"time": msg.time, "configs": []})
+                entry["configs"].extend(extract_configs(msg.text, stats))
+                _note_references(refs, channel, msg)
+            configs = _telegram_configs(channel, kept, sorted((int(k) for k in kept), reverse=True))
+            print(f"  Found {len(configs)} raw configs from @{channel}")
+            return configs
+
+        # cursor: this channel's state/telegram.json entry; only posts after last_id are parsed,
+        # earlier ones are kept per message ID as {"time": ..., "configs": [...]}
+        last_id = cursor.get("last_id", 0)
+        kept = cursor.setdefault("messages", {})
+        for key, entry in kept.items():
+            if isinstance(entry, list):
+                # state saved before post times were recorded
+                kept[key] = {"time": 0, "configs": entry}
+        parsed = 0
+        for msg in messages:
+            if msg.id > last_id:
+                kept[str(msg.id)] = {"time": msg.time,
+                                     "configs": list(dict.fromkeys(extract_configs(msg.text, stats)))}
+                _note_references(refs, channel, msg)
+                parsed += 1
+
+        if backfill > 0:
+            parsed += _backfill_telegram(http, channel, kept, backfill, stats, timeout, refs, until, last_id,
+                                         min((msg.id for msg in messages), default=None))
+
+        ids = sorted((int(k) for k in kept), reverse=True)
+        for msg_id in ids[TG_KEEP_MESSAGES:]:
+            del kept[str(msg_id)]
+        cursor["last_id"] = max(last_id, ids[0]) if ids else last_id
+
+        configs = _telegram_configs(channel, kept, ids[:TG_KEEP_MESSAGES])
+        print(f"  Found {len(configs)} raw configs from @{channel} ({parsed} new messages parsed)")
+        return configs
     except Exception as e:
         print(f"  Error for @{channel}: {e}")
+        if stats is not None:
+            stats.status = _error_status(e)
     return []
 
-def fetch_from_custom_subs():
-    """خواندن لینک‌های سابسکریپشن دستی از فایل custom_subs.txt و استخراج کانفیگ‌ها"""
-    configs = []
-    subs_file = 'custom_subs.txt'
+def _backfill_telegram(http, channel, kept, budget, stats=None, timeout=TELEGRAM_TIMEOUT, refs=None,
+                       until=None, last_id=0, before=None):
+    """Page back with ?before=: first the gap between the newest page and the last run, then older history."""
+    deadline = time.monotonic() + budget
+    if until is not None:
+        deadline = min(deadline, until - MIN_REQUEST_TIMEOUT)
+    # `before` is the oldest ID on the newest page; posts between it and last_id came since the last run
+    gap = bool(last_id) and before is not None and before > last_id + 1
+    parsed = 0
+    while time.monotonic() < deadline:
+        if not gap:
+            if len(kept) >= TG_KEEP_MESSAGES:
+                break
+            before = min((int(k) for k in kept), default=0)
+        elif sum(1 for k in kept if int(k) >= before) >= TG_KEEP_MESSAGES:
+            break  # anything older than this would be trimmed anyway
+        if before <= 1:
+            break
+        status = stats.status if stats is not None else None
+        try:
+            messages = _fetch_telegram_page(http, channel, before=before, stats=stats, timeout=timeout,
+                                            until=until)
+        except Exception as e:
+            print(f"  Backfill stopped for @{channel}: {e}")
+            messages = None
+        if messages is None:
+            # a failed page ends the backfill, not the channel
+            if stats is not None:
+                stats.status = status
+            break
+        older = [msg for msg in messages if msg.id < before and not (gap and msg.id <= last_id)]
+        if not older:
+            if gap:
+                gap = False
+                continue
+            break
+        for msg in older:
+            kept[str(msg.id)] = {"time": msg.time,
+                                 "configs": list(dict.fromkeys(extract_configs(msg.text, stats)))}
+            _note_references(refs, channel, msg)
+            parsed += 1
+        before = min(msg.id for msg in older)
+        if gap and before <= last_id + 1:
+            gap = False
+    return parsed
+
+def read_custom_subs(subs_file='custom_subs.txt'):
+    """لیست لینک‌های سابسکریپشن دستی از فایل custom_subs.txt"""
     if not os.path.exists(subs_file):
+        return []
+    with open(subs_file, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def parse_sub_body(content, stats=None):
+    """استخراج کانفیگ‌ها از بدنه یک سابسکریپشن (base64 یا متن ساده)"""
+    configs = []
+    content = content.strip()
+    if not content:
         return configs
 
-    with open(subs_file, 'r') as f:
-        urls = [line.strip() for line in f if line.strip()]
+    # تلاش برای دیکد base64 (اگر کل محتوا base64 باشد)
+    t0 = time.perf_counter()
+    try:
+        decoded = base64.b64decode(content).decode('utf-8')
+        lines = decoded.splitlines()
+    except:
+        # اگر دیکد نشد، محتوا را خط به خط به عنوان متن ساده در نظر بگیر
+        lines = content.splitlines()
+    t1 = time.perf_counter()
+
+    configs = filter_config_lines(lines)
+    if stats is not None:
+        stats.b64_s += t1 - t0
+        stats.scan_s += time.perf_counter() - t1
+    return configs
 
-    print(f"\nFetching from {len(urls)} custom subscription URLs...")
-    for url in urls:
-        try:
-            print(f"  Fetching: {url}")
-            r = requests.get(url, timeout=15)
-            if r.status_code != 200:
-                print(f"    HTTP {r.status_code}")
-                continue
+def fetch_custom_sub(url, session=None, cache=None, stats=None, timeout=SUB_TIMEOUT, until=None):
+    """دریافت یک لینک سابسکریپشن و استخراج کانفیگ‌ها"""
+    # cache: this URL's state/http_cache.json entry; on 304 or an unchanged body
+    # its configs are reused without parsing
+    http = session or requests
+    headers = {}
+    if cache and any(isinstance(c, str) for c in cache.get("configs", ())):
+        # cached before configs were stored as [uri, key] pairs
+        del cache["configs"]
+    if cache and "configs" in cache:
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+    try:
+        print(f"  Fetching: {url}")
+        t0 = time.monotonic()
+        with http.get(url, timeout=_request_timeout(timeout, until), headers=headers,
+                      stream=until is not None) as r:
+            body = _read_body(r, until, url)
+        fetch_secs = time.monotonic() - t0
+        if stats is not None:
+            stats.latency_s += fetch_secs
+            stats.bytes += len(body)
+            stats.status = str(r.status_code)
+
+        if r.status_code == 304 and headers:
+            _record_cache_hit(cache, cache.get("bytes", 0),
+                              cache.get("parse_seconds", 0) + max(0.0, cache.get("fetch_seconds", 0) - fetch_secs))
+            print(f"    Not modified, reusing {len(cache['configs'])} configs from cache")
+            return list(cache["configs"])
+        if r.status_code != 200:
+            print(f"    HTTP {r.status_code} for {url}")
+            return []
+
+        digest = hashlib.sha256(body).hexdigest()
+        if cache is not None:
+            cache["etag"] = r.headers.get("ETag", "")
+            cache["last_modified"] = r.headers.get("Last-Modified", "")
+            cache["fetch_seconds"] = round(fetch_secs, 3)
+            if cache.get("sha256") == digest and "configs" in cache:
+                _record_cache_hit(cache, 0, cache.get("parse_seconds", 0))
+                if stats is not None:
+                    stats.status = "cached"
+                print(f"    Unchanged body, reusing {len(cache['configs'])} configs from cache")
+                return list(cache["configs"])
+
+        t0 = time.monotonic()
+        configs = parse_sub_body(_decode_body(r, body), stats)
+        if cache is not None:
+            cache["sha256"] = digest
+            cache["bytes"] = len(body)
+            cache["parse_seconds"] = round(time.monotonic() - t0, 3)
+            cache["configs"] = configs
+        return configs
 
-            content = r.text.strip()
-            if not content:
-                continue
+    except Exception as e:
+        print(f"    Error for {url}: {e}")
+        if stats is not None:
+            stats.status = _error_status(e)
+    return []
 
-            # تلاش برای دیکد base64 (اگر کل محتوا base64 باشد)
+def _record_cache_hit(cache, saved_bytes, saved_secs):
+    cache["hits"] = cache.get("hits", 0) + 1
+    cache["bytes_saved"] = cache.get("bytes_saved", 0) + saved_bytes
+    cache["seconds_saved"] = round(cache.get("seconds_saved", 0) + saved_secs, 3)
+
+async def fetch_all_sources(channels, sub_urls, deadline=FETCH_DEADLINE, session=None,
+                            tg_state=None, backfill=TG_BACKFILL, http_cache=None,
+                            history=None, stats=None, discovered=None):
+    """دریافت هم‌زمان همه کانال‌ها و سابسکریپشن‌ها، حداکثر تا `deadline` ثانیه"""
+    session = session or make_session()
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=POOL_SIZE)
+    host_sems = {}
+
+    def _host_sem(url):
+        host = urllib.parse.urlsplit(url).hostname or ""
+        if host not in host_sems:
+            host_sems[host] = asyncio.Semaphore(HOST_CONCURRENCY)
+        return host_sems[host]
+
+    # sources still running at the deadline are dropped, and ones that would
+    # start with less than MIN_REQUEST_TIMEOUT left are skipped
+    start = time.monotonic()
+    until = start + deadline
+
+    async def _run(url, job):
+        async with _host_sem(url):
+            if until - time.monotonic() < MIN_REQUEST_TIMEOUT:
+                return None
+            return await loop.run_in_executor(executor, job)
+
+    # each job works on its own copy of its state entry; only finished jobs write it back
+    tg_state = tg_state if tg_state is not None else {}
+    http_cache = http_cache if http_cache is not None else {}
+    history = history or SourceHistory({})
+    # tasks are keyed by label: a repeated channel or URL is fetched once
+    channels = list(dict.fromkeys(channels))
+    sub_urls = list(dict.fromkeys(sub_urls))
+    sources = []
+    refs = {}
+    for ch in channels:
+        label = f"@{ch}"
+        entry = copy.deepcopy(tg_state.get(ch, {}))
+        st = SourceStats(label, "telegram", timeout_s=history.timeout_for(label, TELEGRAM_TIMEOUT))
+        refs[label] = [] if discovered is not None else None
+        job = functools.partial(fetch_from_telegram, ch, session, entry, backfill, st, st.timeout_s,
+                                refs[label], until)
+        sources.append((label, f"{TELEGRAM_BASE}{ch}", tg_state, ch, entry, st, job))
+    for url in sub_urls:
+        entry = copy.deepcopy(http_cache.get(url, {}))
+        st = SourceStats(url, "sub", timeout_s=history.timeout_for(url, SUB_TIMEOUT))
+        job = functools.partial(fetch_custom_sub, url, session, entry, st, st.timeout_s, until)
+        sources.append((url, url, http_cache, url, entry, st, job))
+    # best past yield per second first; sources that keep yielding nothing got a short timeout above
+    rank = {label: i for i, label in enumerate(history.order(src[0] for src in sources))}
+    tasks = {}
+    for src in sorted(sources, key=lambda src: rank[src[0]]):
+        tasks[src[0]] = asyncio.ensure_future(_run(src[1], src[6]))
+
+    results = []
+    try:
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=deadline)
+        for label, _, store, key, entry, st, _ in sources:
+            task = tasks[label]
+            if stats is not None:
+                stats.append(st)
+            if not task.done():
+                task.cancel()
+                st.status = "deadline"
+                st.latency_s = time.monotonic() - start
+                print(f"  Deadline reached, skipping {label}")
+                continue
+            if not task.exception() and task.result() is None:
+                st.status = "skipped"
+                print(f"  Deadline too close, not started: {label}")
+                continue
+            if task.exception() is not None:
+                st.status = f"error: {type(task.exception()).__name__}"
+                print(f"  Error for {label}: {task.exception()}")
+                continue
+            store[key] = entry
+            if refs.get(label):
+                discovered.extend(refs[label])
+            st.raw_count = len(task.result())
+            results.append((label, task.result()))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f"  Fetched {len(results)}/{len(sources)} sources in {time.monotonic() - start:.1f}s")
+    return results
+
+def discover_sources(args, discovered, sub_urls, session, tg_state, http_cache, history, stats,
+                     cached_urls, deadline=None):
+    """Add this run's references to the frontier and fetch the best discovered sources."""
+    frontier = Frontier(load_state(FRONTIER_STATE))
+    frontier.update(history)
+    for label, entry in frontier.data.items():
+        if entry.get("dropped") and entry["kind"] == "telegram":
+            tg_state.pop(label[1:], None)
+    known = {f"@{ch}" for ch in CHANNELS} | set(sub_urls)
+    added = frontier.add_references(discovered, known)
+    picks = frontier.pick(history, args.discover_max)
+    channels = [label[1:] for label, kind in picks if kind == "telegram"]
+    urls = [label for label, kind in picks if kind == "sub"]
+    deadline = args.discover if deadline is None else deadline
+    if deadline < MIN_REQUEST_TIMEOUT:
+        print(f"\nDiscovery: {added} new sources, {len(frontier.data)} in frontier; "
+              f"no time left to fetch any")
+        save_state(FRONTIER_STATE, frontier.data)
+        return []
+    print(f"\nDiscovery: {added} new sources, {len(frontier.data)} in frontier; "
+          f"fetching {len(channels)} channels and {len(urls)} subscriptions "
+          f"within {deadline:.0f}s...")
+    found = []
+    results = asyncio.run(fetch_all_sources(channels, urls, deadline=deadline, session=session,
+                                            tg_state=tg_state, http_cache=http_cache,
+                                            history=history, stats=stats, discovered=found))
+    frontier.add_references(found, known)
+    save_state(FRONTIER_STATE, frontier.data)
+    cached_urls.extend(urls)
+    return results
+
+def print_cache_savings(http_cache, sub_urls):
+    hits = [(url, http_cache[url]) for url in sub_urls if http_cache.get(url, {}).get("hits")]
+    if not hits:
+        return
+    print("\nHTTP cache savings (cumulative):")
+    for url, entry in hits:
+        print(f"  {url}: {entry['hits']} hits, {entry.get('bytes_saved', 0) / 1e6:.2f} MB, "
+              f"{entry.get('seconds_saved', 0):.1f}s saved")
+
+def folder_signature(folder_path='configs'):
+    """(path, size, mtime) of every file under `folder_path`, to notice edits cheaply."""
+    sig = []
+    for root, dirs, files in os.walk(folder_path):
+        for file in files:
             try:
-                decoded = base64.b64decode(content).decode('utf-8')
-                lines = decoded.splitlines()
-            except:
-                # اگر دیکد نشد، محتوا را خط به خط به عنوان متن ساده در نظر بگیر
-                lines = content.splitlines()
-
-            for line in lines:
-                line = line.strip()
-                if any(line.startswith(p) for p in PROTOCOLS):
-                    configs.append(line)
+                st = os.stat(os.path.join(root, file))
+            except OSError:
+                continue
+            sig.append((os.path.join(root, file), st.st_size, st.st_mtime_ns))
+    return sorted(sig)
 
+def _scan_config_file(file_path, parallel=True):
+    """[[uri, key]] for a file's config lines, large files on the process pool like filter_config_lines."""
+    configs = []
+    # استفاده از utf-8-sig برای حذف BOM در صورت وجود
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        chunks = iter(lambda: list(itertools.islice(f, PARSE_CHUNK_LINES)), [])
+        head = list(itertools.islice(chunks, -(-PARALLEL_MIN_LINES // PARSE_CHUNK_LINES)))
+        chunks = itertools.chain(head, chunks)
+        if not parallel or sum(map(len, head)) < PARALLEL_MIN_LINES or (os.cpu_count() or 1) < 2:
+            for chunk in chunks:
+                configs.extend([uri, key] for uri, key in parse_config_lines(chunk))
+            return configs
+        try:
+            pool = _get_parse_pool()
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(pool.submit(parse_config_lines, chunk))
+                if len(in_flight) > 2 * (os.cpu_count() or 2):
+                    configs.extend([uri, key] for uri, key in in_flight.popleft().result())
+            while in_flight:
+                configs.extend([uri, key] for uri, key in in_flight.popleft().result())
+            return configs
         except Exception as e:
-            print(f"    Error: {e}")
-
-    print(f"  Total raw configs from custom subs: {len(configs)}")
-    return configs
+            print(f"    Parse pool unavailable ({e}), parsing in-process")
+    return _scan_config_file(file_path, parallel=False)
 
-def read_configs_from_folder(folder_path='configs'):
+def read_configs_from_folder(folder_path='configs', index_path=None):
     """
     خواندن تمام فایل‌های داخل پوشه configs و استخراج کانفیگ‌ها
     با encoding='utf-8-sig' برای حذف خودکار BOM
@@ -138,55 +601,123 @@ def read_configs_from_folder(folder_path='configs'):
         return configs
 
     print(f"\nReading configs from folder '{folder_path}'...")
+    index = load_state(index_path) if index_path else {}
+    new_index = {}
+    reused = 0
     for root, dirs, files in os.walk(folder_path):
         for file in files:
             file_path = os.path.join(root, file)
             try:
-                # استفاده از utf-8-sig برای حذف BOM در صورت وجود
-                with open(file_path, 'r', encoding='utf-8-sig') as f:
-                    lines = f.readlines()
-                file_configs = []
-                for line in lines:
-                    line = line.strip()
-                    if line and any(line.startswith(p) for p in PROTOCOLS):
-                        file_configs.append(line)
-                configs.extend(file_configs)
-                print(f"  Loaded {len(file_configs)} configs from {file_path}")
+                st = os.stat(file_path)
+                # unchanged files reuse their configs; actions/checkout resets every
+                # mtime, so in CI a same-size file is matched by its SHA-256
+                entry = index.get(file_path)
+                if entry and entry["size"] == st.st_size and (
+                        entry["mtime_ns"] == st.st_mtime_ns
+                        or entry.get("sha256") == file_sha256(file_path)):
+                    entry["mtime_ns"] = st.st_mtime_ns
+                    reused += 1
+                else:
+                    entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                             "sha256": file_sha256(file_path),
+                             "configs": _scan_config_file(file_path)}
+                    print(f"  Loaded {len(entry['configs'])} configs from {file_path}")
+                new_index[file_path] = entry
+                configs.extend(entry["configs"])
             except Exception as e:
                 print(f"  Error reading {file_path}: {e}")
 
-    print(f"  Total raw configs from folder: {len(configs)}")
+    if index_path:
+        save_state(index_path, new_index)
+    print(f"  Total raw configs from folder: {len(configs)}"
+          f"{f' ({reused} unchanged files reused)' if reused else ''}")
     return configs
 
-def clean_configs(configs):
-    cleaned = []
+def iter_clean_configs(configs, index=None, kept_by_source=None, validator=None):
+    """پاکسازی و حذف کانفیگ‌های تکراری (generator)"""
     seen = set()
+    total = 0
+    kept = 0
+
+    for item in configs:
+        total += 1
+        plain = isinstance(item, str)
+        if not plain and item.key:
+            # already stripped, unescaped and normalized by a parse worker
+            c, norm_c = item.uri, item.key
+        else:
+            c = item if plain else item.uri
+            c = c.strip()
+            c = html.unescape(c)
 
-    print("\nCleaning and removing duplicates (Deep Scan)...")
+            if not c:
+                continue
+            if not has_protocol(c):
+                continue
 
-    for c in configs:
-        c = c.strip()
-        c = html.unescape(c)
-        
-        if not c:
+            norm_c = normalize_config(c)
+        digest = bytes.fromhex(norm_c)
+        if digest in seen:
             continue
-        if not any(c.startswith(p) for p in PROTOCOLS):
-            continue
-        if len(c) < 20:
-            continue
-            
-        if '@' not in c or ':' not in c:
-            continue
-            
-        norm_c = normalize_config(c)
-        
-        if norm_c in seen:
+        source = "" if plain else item.source
+        # every config must pass check_config; a ConfigValidator also logs rejects and drops dead ones
+        if validator is not None:
+            if validator.reject_dead(norm_c, c, source) or validator.reject(c, source):
+                seen.add(digest)
+                continue
+        elif check_config(c) is not None:
+            seen.add(digest)
             continue
-            
-        seen.add(norm_c)
-        cleaned.append(c)
 
-    return cleaned
+        seen.add(digest)
+        kept += 1
+        if kept_by_source is not None and not plain:
+            kept_by_source[item.source] += 1
+        if index is not None:
+            index.touch(norm_c, c, source)
+        yield c if plain else item._replace(uri=c)
+
+    if total:
+        dup = total - kept
+        print(f"  Kept {kept} of {total} ({dup * 100 // total}% dropped as invalid or duplicate)")
+    if validator is not None:
+        print(f"  Validation: {validator.summary()}")
+    if index is not None:
+        print(f"  Index: {index.new_count} new, {index.known_count} seen in earlier runs")
+
+def clean_configs(configs, index=None):
+    print("\nCleaning and removing duplicates (Deep Scan)...")
+    return list(iter_clean_configs(configs, index))
+
+def iter_collected(results, folder_configs=(), fetched_at=0.0):
+    """Merge fetch results into one stream of Collected records, newest first."""
+    # a channel's records already come newest first and every other source is
+    # stamped with fetched_at, so the sources merge without a sorted copy
+    def _stream(label, configs):
+        for c in configs:
+            if isinstance(c, Collected):
+                yield c if c.ts else c._replace(ts=fetched_at)
+            else:
+                yield Collected(c[0], label, c[1], ts=fetched_at)
+
+    streams = [_stream(label, configs) for label, configs in results]
+    streams.append(_stream("configs/", folder_configs))
+    results.clear()
+    return heapq.merge(*streams, key=lambda c: -c.ts)
+
+def iter_fresh(configs, max_age_days, now, stale_by_source=None):
+    """Drop Collected records older than `max_age_days` (0 keeps everything)."""
+    cutoff = now - max_age_days * 86400 if max_age_days > 0 else float("-inf")
+    stale = 0
+    for item in configs:
+        if item.ts >= cutoff:
+            yield item
+            continue
+        stale += 1
+        if stale_by_source is not None:
+            stale_by_source[item.source] += 1
+    if stale:
+        print(f"  Dropped {stale} configs posted more than {max_age_days:g} days ago")
 
 def commit_output():
     try:
@@ -206,39 +737,209 @@ def commit_output():
         print(f"Git error: {e}")
         sys.exit(1)
 
-def main():
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Collect V2Ray configs from Telegram and subscriptions")
+    p.add_argument("--backfill", type=float, default=TG_BACKFILL,
+                   help="Seconds per channel to page back through older messages (default: off)")
+    p.add_argument("--discover", type=float, default=DISCOVER_BUDGET, metavar="SECONDS",
+                   help="Also fetch channels/subscriptions discovered in messages, within this "
+                        "many seconds per run (default: off)")
+    p.add_argument("--discover-max", type=int, default=DISCOVER_MAX,
+                   help=f"Discovered sources fetched per run (default: {DISCOVER_MAX})")
+    p.add_argument("--budget", type=float, default=RUN_BUDGET, metavar="SECONDS",
+                   help=f"Total time for the run: fetching is cut short so that outputs are "
+                        f"always written within it, keeping {OUTPUT_RESERVE}s for that (default: off)")
+    p.add_argument("--max-age", type=float, default=MAX_AGE_DAYS,
+                   help=f"Drop configs posted more than this many days ago, 0 = off (default: {MAX_AGE_DAYS})")
+    p.add_argument("--index-ttl", type=float, default=INDEX_TTL_DAYS,
+                   help=f"Forget configs not seen for this many days (default: {INDEX_TTL_DAYS})")
+    p.add_argument("--endpoints", action="store_true",
+                   help="Also write output/endpoints.json: the configs grouped by (host, port, sni), "
+                        "which scanner.py / local_scan.py read instead of re-parsing sub.txt")
+    p.add_argument("--daemon", action="store_true",
+                   help="Keep running: poll each source on its own adaptive interval and "
+                        "write outputs whenever the config set changes")
+    p.add_argument("--no-commit", action="store_true",
+                   help="Write output/ but do not git commit and push it")
+    return p.parse_args(argv)
+
+def publish_outputs(args, results, folder_configs, stats, index, history, started, t_start):
+    """Clean and write this run's configs, then the report and delta; returns (count, changed)."""
+    print("\nCleaning, removing duplicates and writing output (streaming)...")
+    kept_by_source = Counter()
+    stale_by_source = Counter()
+    fresh = iter_fresh(iter_collected(results, folder_configs, fetched_at=started),
+                       args.max_age, started, stale_by_source)
+    os.makedirs(STATE_DIR, exist_ok=True)
+    dead = DeadFilter.load(DEAD_FILTER) if os.path.exists(DEAD_FILTER) else None
+    validator = ConfigValidator(REJECTS_LOG, dead)
+    cleaned = iter_clean_configs(fresh, index, kept_by_source, validator)
+    uris = (c.uri for c in cleaned)
+    endpoints = EndpointGroups() if args.endpoints else None
+    if endpoints is not None:
+        uris = endpoints.collect(uris)
+    count, changed = write_subscription(uris)
+    validator.close()
+    if endpoints is not None and (changed or not os.path.exists(ENDPOINTS_FILE)):
+        print(f"  endpoints.json: {write_endpoints(endpoints)} endpoints")
+    for st in stats:
+        st.unique_count = kept_by_source[st.source]
+        st.stale_count = stale_by_source[st.source]
+        st.rejected_count = validator.by_source[st.source]
+        history.update(st)
+    save_state(HISTORY_STATE, history.data)
+    write_report(REPORT_FILE, stats, started, time.monotonic() - t_start, validator.by_reason)
+    if changed:
+        delta = publish_delta(index)
+        print(f"Delta v{delta['version']}: +{delta['added']} -{delta['removed']}"
+              f"{' (reset)' if delta['reset'] else ''}")
+    return count, changed
+
+def run_daemon(args):
+    """--daemon: collect in one long-running process, polling each source on its own interval."""
+    print(f"--- Collector daemon started at {datetime.datetime.now()} ---")
+    session = make_session()
+    tg_state = load_state(TELEGRAM_STATE)
+    http_cache = load_state(HTTP_CACHE_STATE)
+    history = SourceHistory(load_state(HISTORY_STATE))
+    index = ConfigIndex(INDEX_DB)
+    schedule = PollSchedule()
+    last = {}                 # source label -> configs from its last successful poll
+    discovered_labels = set()
+    folder_sig, folder_configs = None, []
+    next_discovery = 0.0
+    try:
+        while True:
+            started, t_start = time.time(), time.monotonic()
+            sub_urls = read_custom_subs()
+            configured = [f"@{ch}" for ch in CHANNELS] + sub_urls
+            channels = [ch for ch in CHANNELS if schedule.due(f"@{ch}", t_start)]
+            urls = [url for url in sub_urls if schedule.due(url, t_start)]
+            discovered = [] if args.discover > 0 and t_start >= next_discovery else None
+            stats = []
+            print(f"\n[{datetime.datetime.now():%Y-%m-%d %H:%M:%S}] Polling {len(channels)} channels "
+                  f"and {len(urls)} subscriptions ({len(configured) - len(channels) - len(urls)} not due)...")
+            results = asyncio.run(fetch_all_sources(channels, urls, session=session, tg_state=tg_state,
+                                                    backfill=args.backfill, http_cache=http_cache,
+                                                    history=history, stats=stats, discovered=discovered))
+            cached_urls = list(sub_urls)
+            if discovered is not None:
+                extra = discover_sources(args, discovered, sub_urls, session, tg_state, http_cache,
+                                         history, stats, cached_urls)
+                for label in discovered_labels:
+                    last.pop(label, None)
+                discovered_labels = {label for label, _ in extra}
+                results += extra
+                next_discovery = t_start + DAEMON_DISCOVER_EVERY
+            else:
+                cached_urls += [label for label in discovered_labels if label in http_cache]
+            save_state(TELEGRAM_STATE, tg_state)
+            save_state(HTTP_CACHE_STATE, {url: http_cache[url] for url in cached_urls if url in http_cache})
+
+            now = time.monotonic()
+            fetched = dict(results)
+            for st in stats:
+                # on an HTTP error or timeout the source keeps its previous configs
+                if st.source in fetched and st.status in ("200", "304", "cached"):
+                    last[st.source] = fetched[st.source]
+                    if st.source not in discovered_labels:
+                        schedule.record(st.source, fetched[st.source], now)
+                else:
+                    schedule.failed(st.source, now)
+            active = set(configured) | discovered_labels
+            for label in [label for label in last if label not in active]:
+                del last[label]
+
+            sig = folder_signature('configs')
+            if sig != folder_sig:
+                folder_configs, folder_sig = read_configs_from_folder('configs', FOLDER_INDEX), sig
+            stats.append(SourceStats("configs/", "folder", status="ok", raw_count=len(folder_configs)))
+
+            index.start_run(started)
+            count, changed = publish_outputs(args, list(last.items()), folder_configs, stats,
+                                             index, history, started, t_start)
+            expired = index.expire(args.index_ttl)
+            print(f"Total unique cleaned configs: {count}"
+                  f"{'' if changed else ' (unchanged, nothing written)'}"
+                  f"{f', expired {expired}' if expired else ''}")
+            if changed and not args.no_commit:
+                try:
+                    commit_output()
+                except SystemExit:
+                    print("Commit failed; will retry after the next change.")
+
+            wait = schedule.next_wakeup(configured, time.monotonic())
+            print(f"Next poll in {wait:.0f}s")
+            time.sleep(wait)
+    except KeyboardInterrupt:
+        print("\nStopping collector daemon.")
+    finally:
+        index.close()
+        shutdown_parse_pool()
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.daemon:
+        run_daemon(args)
+        return
     print(f"--- Collector Started at {datetime.datetime.now()} ---")
-    all_configs = []
-
-    # دریافت از کانال‌های تلگرام
-    for channel in CHANNELS:
-        configs = fetch_from_telegram(channel)
-        all_configs.extend(configs)
-
-    # دریافت از لینک‌های سابسکریپشن دستی
-    custom_configs = fetch_from_custom_subs()
-    all_configs.extend(custom_configs)
+    started, t_start = time.time(), time.monotonic()
+
+    # دریافت همزمان از کانال‌های تلگرام و لینک‌های سابسکریپشن دستی
+    sub_urls = read_custom_subs()
+    tg_state = load_state(TELEGRAM_STATE)
+    http_cache = load_state(HTTP_CACHE_STATE)
+    history = SourceHistory(load_state(HISTORY_STATE))
+    session = make_session()
+    stats = []
+    discovered = [] if args.discover > 0 else None
+    fetch_deadline = FETCH_DEADLINE
+    if args.budget > 0:
+        # configured sources get what is left after discovery and writing outputs
+        fetch_deadline = max(0.0, args.budget - OUTPUT_RESERVE - max(args.discover, 0))
+        print(f"Run budget {args.budget:g}s: fetch deadline {fetch_deadline:.0f}s, "
+              f"{OUTPUT_RESERVE}s kept for output")
+    print(f"\nFetching {len(CHANNELS)} channels and {len(sub_urls)} custom subscription URLs...")
+    results = asyncio.run(fetch_all_sources(CHANNELS, sub_urls, deadline=fetch_deadline, session=session,
+                                            tg_state=tg_state, backfill=args.backfill,
+                                            http_cache=http_cache, history=history, stats=stats,
+                                            discovered=discovered))
+    cached_urls = list(sub_urls)
+    if discovered is not None:
+        discover_deadline = args.discover
+        if args.budget > 0:
+            discover_deadline = min(args.discover,
+                                    args.budget - OUTPUT_RESERVE - (time.monotonic() - t_start))
+        results += discover_sources(args, discovered, sub_urls, session, tg_state, http_cache,
+                                    history, stats, cached_urls, discover_deadline)
+    save_state(TELEGRAM_STATE, tg_state)
+    # آدرس‌هایی که از custom_subs.txt حذف شده‌اند از کش هم پاک می‌شوند
+    save_state(HTTP_CACHE_STATE, {url: http_cache[url] for url in cached_urls if url in http_cache})
+    print_cache_savings(http_cache, sub_urls)
 
     # دریافت از پوشه configs
-    folder_configs = read_configs_from_folder('configs')
-    all_configs.extend(folder_configs)
-
-    all_configs = clean_configs(all_configs)
-    print(f"\nTotal unique cleaned configs: {len(all_configs)}")
-
-    os.makedirs("output", exist_ok=True)
-
-    with open("output/sub.txt", "w", encoding="utf-8") as f:
-        f.write("\n".join(all_configs))
-
-    encoded = base64.b64encode("\n".join(all_configs).encode()).decode()
-    with open("output/base64.txt", "w", encoding="utf-8") as f:
-        f.write(encoded)
+    folder_configs = read_configs_from_folder('configs', FOLDER_INDEX)
+    stats.append(SourceStats("configs/", "folder", status="ok", raw_count=len(folder_configs)))
+
+    index = ConfigIndex(INDEX_DB)
+    count, changed = publish_outputs(args, results, folder_configs, stats, index, history,
+                                     started, t_start)
+    shutdown_parse_pool()
+    expired = index.expire(args.index_ttl)
+    index.close()
+    print(f"\nTotal unique cleaned configs: {count}")
+    if expired:
+        print(f"Expired {expired} configs not seen for {args.index_ttl:g} days")
+
+    if not changed:
+        print("Config set unchanged since last run — output and commit skipped.")
+        return
 
     print("Files created!")
-    print(f"sub.txt: {len(all_configs)} configs")
+    print(f"sub.txt: {count} configs")
 
-    commit_output()
+    if not args.no_commit:
+        commit_output()
 
     print("Done! Check your repo for updated files.")
 
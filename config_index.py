@@ -0,0 +1,151 @@
+"""
+config_index.py — persistent cross-run index of collected configs
+
+A small SQLite table keyed on the canonical identity key from identity.py,
+recording the URI, the source it last came from, and first-seen / last-seen
+times.  All keys are loaded into an in-memory set of 16-byte digests at
+startup, so membership checks during a run never touch the database; updates
+are buffered and written in one transaction on flush().
+
+The `published` table holds the set last written to output/, so the next
+run can diff against it (see output_writer.publish_delta) without keeping
+either snapshot in memory.
+"""
+
+import os
+import sqlite3
+import time
+from typing import Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS configs (
+    key        BLOB PRIMARY KEY,
+    uri        TEXT NOT NULL,
+    source     TEXT NOT NULL DEFAULT '',
+    first_seen INTEGER NOT NULL,
+    last_seen  INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS configs_last_seen ON configs (last_seen);
+CREATE TABLE IF NOT EXISTS published (
+    key BLOB PRIMARY KEY,
+    uri TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+DAY = 86400
+FLUSH_EVERY = 5000  # buffered touches before an automatic flush
+
+
+class ConfigIndex:
+    def __init__(self, path: str, now: Optional[float] = None):
+        self.path = path
+        self.now = int(now if now is not None else time.time())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.keys = {row[0] for row in self.db.execute("SELECT key FROM configs")}
+        self._pending = {}
+        self.new_count = 0
+        self.known_count = 0
+
+    def start_run(self, now: Optional[float] = None):
+        """Begin a new collection in a long-running process (collector --daemon):
+        touches from here on are stamped with the new `now`."""
+        self.flush()
+        self.now = int(now if now is not None else time.time())
+        self.new_count = 0
+        self.known_count = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def known(self, key: str) -> bool:
+        """True if `key` was indexed by an earlier run (or earlier this run)."""
+        return bytes.fromhex(key) in self.keys
+
+    def touch(self, key: str, uri: str, source: str = ""):
+        """Record that `key` was seen now; new keys get first_seen = now."""
+        k = bytes.fromhex(key)
+        if k in self.keys:
+            if k not in self._pending:
+                self.known_count += 1
+        else:
+            self.keys.add(k)
+            self.new_count += 1
+        self._pending[k] = (uri, source)
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def expire(self, max_age_days: float) -> int:
+        """Drop entries not seen for `max_age_days`; returns how many went."""
+        self.flush()
+        cutoff = self.now - int(max_age_days * DAY)
+        stale = [row[0] for row in self.db.execute(
+            "SELECT key FROM configs WHERE last_seen < ?", (cutoff,))]
+        if stale:
+            self.db.execute("DELETE FROM configs WHERE last_seen < ?", (cutoff,))
+            self.keys.difference_update(stale)
+            self.db.commit()
+        return len(stale)
+
+    def flush(self):
+        """Write buffered touches in one transaction."""
+        if not self._pending:
+            return
+        rows = [(k, uri, src, self.now, self.now) for k, (uri, src) in self._pending.items()]
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO configs (key, uri, source, first_seen, last_seen) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET uri = excluded.uri, source = excluded.source, "
+                "last_seen = excluded.last_seen",
+                rows,
+            )
+        self._pending.clear()
+
+    def entries(self, since: float = 0) -> Iterator[Tuple[str, str, str, int, int]]:
+        """(key, uri, source, first_seen, last_seen) for entries seen since `since`."""
+        for k, uri, src, first, last in self.db.execute(
+                "SELECT key, uri, source, first_seen, last_seen FROM configs WHERE last_seen >= ?",
+                (int(since),)):
+            yield k.hex(), uri, src, first, last
+
+    def published_version(self) -> int:
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'published_version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def diff_published(self) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """(added [(key, uri)], removed [key]) between this run's configs and
+        the last published set.  A key published with a different URI (e.g. a
+        rotated reality pbk, which is not part of the key) is listed in
+        `added` with its new URI."""
+        self.flush()
+        added = [(k.hex(), uri) for k, uri in self.db.execute(
+            "SELECT c.key, c.uri FROM configs c LEFT JOIN published p ON p.key = c.key "
+            "WHERE c.last_seen = ? AND (p.key IS NULL OR p.uri != c.uri)", (self.now,))]
+        removed = [k.hex() for (k,) in self.db.execute(
+            "SELECT key FROM published WHERE key NOT IN "
+            "(SELECT key FROM configs WHERE last_seen = ?)", (self.now,))]
+        return added, removed
+
+    def reset_published(self):
+        """Forget the published set (the next diff lists everything as added)."""
+        with self.db:
+            self.db.execute("DELETE FROM published")
+
+    def mark_published(self, version: int):
+        """Make this run's configs the published set, as `version`."""
+        self.flush()
+        with self.db:
+            self.db.execute("DELETE FROM published")
+            self.db.execute("INSERT INTO published (key, uri) "
+                            "SELECT key, uri FROM configs WHERE last_seen = ?", (self.now,))
+            self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('published_version', ?)",
+                            (str(version),))
+
+    def close(self):
+        self.flush()
+        self.db.close()
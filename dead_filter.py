@@ -0,0 +1,141 @@
+"""
+dead_filter.py — compact, decaying record of configs that keep failing scans
+
+DeadFilter is a stack of Bloom filters over canonical identity keys
+(identity.py): layer i holds the keys that failed at least i + 1 scans,
+and a key in the top layer (STRIKES failures) counts as dead.  Filters
+come in two generations; every GENERATION_DAYS the current one becomes
+the previous one and a fresh one starts.  A failure is counted on top of
+the strikes in either generation, so a key drops out after two quiet
+generations: servers that come back are retried eventually, and nothing
+grows without bound.
+
+local_scan.py records failures after every full scan; collector.py and
+scanner.load_input(..., dead_filter=...) skip dead configs.  The file is
+zlib-compressed (mostly zero bits); with the defaults it is 2 x 3 x 128 KiB
+in memory and holds ~100k keys per layer at about 1% false positives.
+
+Stdlib only.
+"""
+
+import os
+import struct
+import time
+import zlib
+from typing import Optional
+
+MAGIC = b"DEADBLM1"
+HEADER = struct.Struct("<IIIdd")  # bits, hashes, strikes, current_started, previous_started
+BITS = 1 << 20          # bits per layer
+HASHES = 7
+STRIKES = 3             # failed scans before a config counts as dead
+GENERATION_DAYS = 7.0
+
+
+class BloomLayer:
+    __slots__ = ("bits", "hashes", "data")
+
+    def __init__(self, bits: int, hashes: int, data: Optional[bytearray] = None):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = data if data is not None else bytearray(bits // 8)
+
+    def _positions(self, key: bytes):
+        # double hashing over the 128-bit identity digest
+        h1 = int.from_bytes(key[:8], "little")
+        h2 = int.from_bytes(key[8:16], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key: bytes):
+        for pos in self._positions(key):
+            self.data[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        data = self.data
+        return all(data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DeadFilter:
+    def __init__(self, bits: int = BITS, hashes: int = HASHES, strikes: int = STRIKES,
+                 now: Optional[float] = None):
+        now = now if now is not None else time.time()
+        self.bits = bits
+        self.hashes = hashes
+        self.strikes_needed = strikes
+        self.current = [BloomLayer(bits, hashes) for _ in range(strikes)]
+        self.previous = [BloomLayer(bits, hashes) for _ in range(strikes)]
+        self.current_started = now
+        self.previous_started = now
+
+    @staticmethod
+    def _key(key: str) -> bytes:
+        return bytes.fromhex(key)
+
+    @staticmethod
+    def _count(layers, k: bytes) -> int:
+        n = 0
+        for layer in layers:
+            if k not in layer:
+                break
+            n += 1
+        return n
+
+    def strikes(self, key: str) -> int:
+        """Failed scans recorded for `key` (an identity key) in the last two generations."""
+        k = self._key(key)
+        return max(self._count(self.current, k), self._count(self.previous, k))
+
+    def is_dead(self, key: str) -> bool:
+        k = self._key(key)
+        return k in self.current[-1] or k in self.previous[-1]
+
+    def record_failure(self, key: str):
+        k = self._key(key)
+        n = min(max(self._count(self.current, k), self._count(self.previous, k)) + 1,
+                self.strikes_needed)
+        for layer in self.current[:n]:
+            layer.add(k)
+
+    def rotate(self, generation_days: float = GENERATION_DAYS, now: Optional[float] = None) -> bool:
+        """Start a new generation if the current one is older than `generation_days`."""
+        now = now if now is not None else time.time()
+        if now - self.current_started < generation_days * 86400:
+            return False
+        self.previous, self.previous_started = self.current, self.current_started
+        self.current = [BloomLayer(self.bits, self.hashes) for _ in range(self.strikes_needed)]
+        self.current_started = now
+        return True
+
+    @classmethod
+    def load(cls, path: str) -> "DeadFilter":
+        """Read a filter file; a missing or unreadable file gives an empty filter."""
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            if raw[:len(MAGIC)] != MAGIC:
+                raise ValueError("not a dead filter file")
+            bits, hashes, strikes, cur, prev = HEADER.unpack_from(raw, len(MAGIC))
+            body = zlib.decompress(raw[len(MAGIC) + HEADER.size:])
+            size = bits // 8
+            if len(body) != 2 * strikes * size:
+                raise ValueError("truncated dead filter file")
+        except (OSError, ValueError, struct.error, zlib.error):
+            return cls()
+        self = cls(bits, hashes, strikes, now=cur)
+        layers = [BloomLayer(bits, hashes, bytearray(body[i * size:(i + 1) * size]))
+                  for i in range(2 * strikes)]
+        self.current, self.previous = layers[:strikes], layers[strikes:]
+        self.current_started, self.previous_started = cur, prev
+        return self
+
+    def save(self, path: str):
+        """Write the filter atomically (temp file + rename)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        body = zlib.compress(b"".join(bytes(layer.data) for layer in self.current + self.previous), 6)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(HEADER.pack(self.bits, self.hashes, self.strikes_needed,
+                                self.current_started, self.previous_started))
+            f.write(body)
+        os.replace(tmp, path)
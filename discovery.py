@@ -0,0 +1,114 @@
+"""
+discovery.py — find new sources in collected Telegram messages
+
+find_references() pulls t.me/<channel> links, @channel mentions and
+subscription-looking URLs out of a message.  Frontier keeps every source
+found that way in state/frontier.json (times referenced, first and last
+seen, who referenced it first) and picks which ones to fetch in a run:
+most unique configs per second of fetch time first (run_report.SourceHistory),
+never-fetched sources ordered by how often they were referenced.  Sources
+that keep yielding nothing are dropped and not picked again.
+"""
+
+import re
+import time
+from typing import Dict, Iterable, List, Set, Tuple
+
+TME_RE = re.compile(
+    r"(?:https?://)?(?:www\.)?(?:t|telegram)\.me/(?:s/)?([A-Za-z][A-Za-z0-9_]{3,31})(?=/\d|[^A-Za-z0-9_/]|$)")
+# "@name" at a word start (or after the "#" of a config remark), not "user@host"
+MENTION_RE = re.compile(r"(?:^|(?<=[\s(\[\"'«#،]))@([A-Za-z][A-Za-z0-9_]{3,31})(?![\w.:@-])", re.M)
+URL_RE = re.compile(r"https?://[^\s<>\"'`]+")
+# t.me paths that are not channels
+TME_RESERVED = frozenset(("addemoji", "addlist", "addstickers", "addtheme", "boost", "c", "contact",
+                          "iv", "joinchat", "login", "proxy", "setlanguage", "share", "socks"))
+SUB_HINTS = ("/sub", "sub=", "/subscribe", "/link/", "token=", "/raw/", "raw.githubusercontent.com",
+             ".txt", "/api/v1/client/")
+
+FRONTIER_MAX = 500   # entries kept in state/frontier.json
+DROP_AFTER_RUNS = 3  # consecutive zero-yield runs before a discovered source is dropped
+
+
+def _channel(name: str) -> str:
+    return "" if name.lower() in TME_RESERVED or name.lower().endswith("bot") else name
+
+
+def find_references(text: str, links: Iterable[str] = ()) -> Tuple[Set[str], Set[str]]:
+    """(channel names, subscription URLs) referenced in a message."""
+    channels, subs = set(), set()
+    for source in (text, *links):
+        for name in TME_RE.findall(source):
+            if _channel(name):
+                channels.add(name)
+        for url in URL_RE.findall(source):
+            url = url.rstrip(".,;:!?)]}")
+            low = url.lower()
+            if "t.me/" in low or "telegram.me/" in low:
+                continue
+            if any(hint in low for hint in SUB_HINTS):
+                subs.add(url)
+    for name in MENTION_RE.findall(text):
+        if _channel(name):
+            channels.add(name)
+    return channels, subs
+
+
+class Frontier:
+    """Discovered sources keyed like SourceHistory ("@channel", lowercased, or the URL as found)."""
+
+    def __init__(self, data: Dict[str, dict]):
+        self.data = {}
+        for label, entry in data.items():
+            if label.startswith("@"):
+                label = label.lower()  # t.me names are case-insensitive
+                seen = self.data.get(label)
+                if seen is not None:
+                    seen["refs"] += entry["refs"]
+                    seen["last_seen"] = max(seen.get("last_seen", 0), entry.get("last_seen", 0))
+                    continue
+            self.data[label] = entry
+
+    def add(self, label: str, kind: str, via: str, now: float = None):
+        now = int(now if now is not None else time.time())
+        entry = self.data.get(label)
+        if entry is None:
+            entry = self.data[label] = {"kind": kind, "refs": 0, "first_seen": now, "via": via}
+        entry["refs"] += 1
+        entry["last_seen"] = now
+
+    def add_references(self, refs: Iterable[Tuple[str, Set[str], Set[str]]], known: Set[str]) -> int:
+        """Add (via, channels, subs) tuples from find_references; `known`
+        labels (configured sources) are skipped.  Channel names match in any
+        case, URLs only exactly.  Returns how many are new."""
+        before = len(self.data)
+        known_channels = {label.lower() for label in known if label.startswith("@")}
+        for via, channels, subs in refs:
+            for name in channels:
+                label = f"@{name.lower()}"
+                if label not in known_channels and label != via.lower():
+                    self.add(label, "telegram", via)
+            for url in subs:
+                if url not in known:
+                    self.add(url, "sub", via)
+        self.prune()
+        return len(self.data) - before
+
+    def update(self, history):
+        """Drop sources that yielded nothing for DROP_AFTER_RUNS fetches in a row."""
+        for label, entry in self.data.items():
+            if history.data.get(label, {}).get("zero_runs", 0) >= DROP_AFTER_RUNS:
+                entry["dropped"] = True
+
+    def pick(self, history, limit: int) -> List[Tuple[str, str]]:
+        """Up to `limit` (label, kind) pairs to fetch this run, most valuable first."""
+        live = [(label, e) for label, e in self.data.items() if not e.get("dropped")]
+        live.sort(key=lambda item: (history.score(item[0]), item[1]["refs"]), reverse=True)
+        return [(label, e["kind"]) for label, e in live[:limit]]
+
+    def prune(self):
+        """Keep the FRONTIER_MAX most referenced entries (dropped ones go first)."""
+        if len(self.data) <= FRONTIER_MAX:
+            return
+        ranked = sorted(self.data.items(), key=lambda item: (not item[1].get("dropped"), item[1]["refs"],
+                                                             item[1].get("last_seen", 0)), reverse=True)
+        self.data = dict(ranked[:FRONTIER_MAX])
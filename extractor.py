@@ -0,0 +1,204 @@
+"""
+extractor.py — single-pass config extraction for collector.py
+
+One precompiled alternation finds every supported protocol URI and every
+long base64 run in a single scan of the text, instead of one re.findall per
+protocol plus a separate base64 pass.  Matches never overlap, so the "ss://"
+tail of "vless://" / "vmess://" is no longer picked up as a phantom config.
+
+Base64 runs are pre-screened before decoding: any text containing "://"
+encodes to one of three fixed base64 fragments (depending on its offset
+mod 3), so runs without them cannot hold a config URI and are skipped.
+
+TelegramPageParser reads a t.me/s/ page incrementally (feed() it chunks as
+they download) and keeps only the text of message bodies and code blocks,
+with each message's ID and post time; scripts, styles, link previews and
+navigation never reach the regex.
+"""
+
+import base64
+import datetime
+import html
+import re
+import time
+from typing import List, NamedTuple
+
+from identity import canonical_key
+
+PROTOCOLS = ("vmess://", "vless://", "trojan://", "ss://", "ssr://", "hysteria2://", "hy2://", "tuic://")
+
+CONFIG_PATTERN = r'(?:v(?:mess|less)|trojan|ssr?|h(?:ysteria2|y2)|tuic)://[^\s<>"\'\n]+'
+# lookbehind: only try a base64 run at its first character
+B64_PATTERN = r'(?<![A-Za-z0-9+/=])[A-Za-z0-9+/=]{80,}'
+
+EXTRACT_RE = re.compile(f"({CONFIG_PATTERN})|({B64_PATTERN})")
+
+# base64 of "://" at plaintext offsets 0, 2 and 1 (mod 3)
+B64_SCHEME_MARKS = ("Oi8v", "6Ly", "ovL")
+
+POST_ATTR = 'data-post="'
+POST_ID_RE = re.compile(r'data-post="[^"]*/(\d+)"')
+MESSAGE_TEXT_CLASS = "tgme_widget_message_text"
+REPLY_TEXT_CLASS = "js-message_reply_text"  # truncated quote of another message
+LINK_PREVIEW_CLASS = "tgme_widget_message_link_preview"
+FOOTER_CLASS = "tgme_widget_message_footer"
+TAG_RE = re.compile(r"<[^>]*>")
+HREF_RE = re.compile(r'<a\b[^>]*\bhref="([^"]+)"')
+TIME_RE = re.compile(r'<time\b[^>]*\bdatetime="([^"]+)"')
+
+
+def has_protocol(line: str) -> bool:
+    """True if `line` starts with one of PROTOCOLS."""
+    return line.startswith(PROTOCOLS)
+
+
+def maybe_config_block(block: str) -> bool:
+    """Cheap check: can this base64 run decode to something containing '://'?"""
+    return any(mark in block for mark in B64_SCHEME_MARKS)
+
+
+def decode_b64_block(block: str):
+    """Decode one base64 run and return the config lines inside it
+    (None if the run is not valid base64)."""
+    missing_padding = len(block) % 4
+    if missing_padding:
+        block += '=' * (4 - missing_padding)
+    try:
+        decoded = base64.b64decode(block).decode("utf-8", errors="ignore")
+    except Exception:
+        return None
+    configs = []
+    for line in decoded.splitlines():
+        line = line.strip()
+        if has_protocol(line):
+            configs.append(line)
+    return configs
+
+
+def extract_configs(text: str, stats=None) -> list:
+    """Plain config URIs plus those inside embedded base64 blocks.
+
+    If `stats` is given (a run_report.SourceStats), time spent scanning and
+    decoding and the number of undecodable blocks are added to it.
+    """
+    t0 = time.perf_counter()
+    configs = []
+    blocks = []
+    for uri, block in EXTRACT_RE.findall(text):
+        if uri:
+            configs.append(uri.rstrip(',;.'))
+        elif maybe_config_block(block):
+            blocks.append(block)
+    t1 = time.perf_counter()
+    errors = 0
+    for block in blocks:
+        found = decode_b64_block(block)
+        if found is None:
+            errors += 1
+        else:
+            configs.extend(found)
+    if stats is not None:
+        stats.scan_s += t1 - t0
+        stats.b64_s += time.perf_counter() - t1
+        stats.parse_errors += errors
+    return configs
+
+
+def parse_config_lines(lines) -> list:
+    """Config lines of a subscription body with their canonical keys: [(uri, key)].
+
+    Runs in worker processes for large bodies (see collector.filter_config_lines),
+    so it only depends on this module and identity.py.
+    """
+    out = []
+    for line in lines:
+        line = line.strip()
+        if has_protocol(line):
+            uri = html.unescape(line)
+            out.append((uri, canonical_key(uri)))
+    return out
+
+
+class TelegramMessage(NamedTuple):
+    id: int        # from data-post="channel/<id>"
+    time: float    # POSIX time from <time datetime=...>; 0 if the message has none
+    text: str      # message body and code block text, entities decoded
+    links: tuple = ()  # href targets of links in the body
+
+
+def _parse_datetime(value: str) -> float:
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class TelegramPageParser:
+    """Incremental t.me/s/ page reader producing [TelegramMessage].
+
+    feed() buffers chunks and handles each message once the next data-post
+    anchor has arrived, so memory stays at about one message.  Of each
+    message only the body (the `tgme_widget_message_text` element, code
+    blocks included) is kept: tags become line breaks and entities are
+    decoded.  Reply quotes, link previews, the page head, scripts and
+    everything between messages are skipped with str.find.  Call close()
+    after the last chunk; results are in `.messages`, in page order.
+    """
+
+    def __init__(self):
+        self.messages: List[TelegramMessage] = []
+        self._buf = ""
+
+    def feed(self, data: str):
+        self._buf += data
+        while True:
+            first = self._buf.find(POST_ATTR)
+            if first < 0:
+                # keep a tail in case an anchor is split across chunks
+                self._buf = self._buf[-len(POST_ATTR):]
+                return
+            nxt = self._buf.find(POST_ATTR, first + len(POST_ATTR))
+            if nxt < 0:
+                self._buf = self._buf[first:]
+                return
+            self._message(self._buf[first:nxt])
+            self._buf = self._buf[nxt:]
+
+    def close(self):
+        if self._buf.startswith(POST_ATTR):
+            self._message(self._buf)
+        self._buf = ""
+
+    def _message(self, chunk: str):
+        m = POST_ID_RE.match(chunk)
+        if not m:
+            return
+        start = chunk.find(MESSAGE_TEXT_CLASS)
+        while start >= 0 and chunk.startswith(REPLY_TEXT_CLASS, start + len(MESSAGE_TEXT_CLASS) + 1):
+            start = chunk.find(MESSAGE_TEXT_CLASS, start + 1)
+        if start < 0:
+            return
+        start = chunk.find(">", start) + 1
+        end = len(chunk)
+        for mark in (LINK_PREVIEW_CLASS, FOOTER_CLASS):
+            i = chunk.find(mark, start)
+            if 0 <= i < end:
+                end = i
+        if end < len(chunk):
+            end = chunk.rfind("<", start, end)
+        body = chunk[start:end]
+        text = html.unescape(TAG_RE.sub("\n", body)).strip()
+        if not text:
+            return
+        t = TIME_RE.search(chunk, end)
+        links = tuple(html.unescape(href) for href in HREF_RE.findall(body))
+        self.messages.append(TelegramMessage(int(m.group(1)), _parse_datetime(t.group(1)) if t else 0.0,
+                                             text, links))
+
+
+def parse_telegram_page(text: str) -> List[TelegramMessage]:
+    """Messages of a whole t.me/s/ page (see TelegramPageParser)."""
+    parser = TelegramPageParser()
+    parser.feed(text)
+    parser.close()
+    return parser.messages
@@ -0,0 +1,167 @@
+"""
+identity.py — canonical server identity for config URIs
+
+parse_identity() turns a vmess / vless / trojan / ss / ssr / hysteria2 / tuic
+URI into a ConfigIdentity record: the fields that decide which server a
+client actually talks to.  Remarks, query-parameter order, case of the host
+and UUID, and base64 padding are all normalised away, so two links for the
+same server share one `.key` no matter how a channel re-posted them.
+
+Stdlib only, so scanner.py and local_scan.py can use it as well.
+"""
+
+import base64
+import hashlib
+import json
+import urllib.parse
+from typing import NamedTuple, Optional
+
+
+class ConfigIdentity(NamedTuple):
+    protocol: str
+    host: str
+    port: int
+    credential: str
+    transport: str = ""
+    path: str = ""
+    sni: str = ""
+
+    @property
+    def key(self) -> str:
+        """Stable 128-bit hex digest of the identity (hashable, compact, storable)."""
+        raw = "\x1f".join(str(f) for f in self).encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+PROTOCOL_ALIASES = {"hy2": "hysteria2"}
+
+
+def _b64decode(data: str) -> str:
+    data = data.strip()
+    data += "=" * (-len(data) % 4)
+    try:
+        return base64.b64decode(data, validate=True).decode("utf-8")
+    except Exception:
+        return base64.urlsafe_b64decode(data).decode("utf-8")
+
+
+def _port(value) -> Optional[int]:
+    try:
+        port = int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return port
+
+
+def _host(value: str) -> str:
+    return str(value).strip().strip("[]").lower().rstrip(".")
+
+
+def _first(params: dict, *names: str) -> str:
+    for name in names:
+        if params.get(name):
+            return params[name][0]
+    return ""
+
+
+def _parse_vmess(body: str) -> Optional[ConfigIdentity]:
+    obj = json.loads(_b64decode(body.split("#", 1)[0]))
+    if not isinstance(obj, dict):
+        return None
+    host, port, uid = obj.get("add", ""), _port(obj.get("port")), str(obj.get("id", ""))
+    if not host or port is None or not uid:
+        return None
+    return ConfigIdentity(
+        protocol="vmess",
+        host=_host(host),
+        port=port,
+        credential=uid.strip().lower(),
+        transport=str(obj.get("net") or "tcp").lower(),
+        path=str(obj.get("path") or ""),
+        sni=_host(obj.get("sni") or obj.get("host") or ""),
+    )
+
+
+def _parse_url(protocol: str, uri: str) -> Optional[ConfigIdentity]:
+    u = urllib.parse.urlsplit(uri)
+    if not u.hostname or not u.username:
+        return None
+    port = u.port
+    if port is None:
+        return None
+    params = urllib.parse.parse_qs(u.query)
+    credential = urllib.parse.unquote(u.username)
+    if protocol in ("vless", "tuic"):
+        credential = credential.lower()  # the UUID only; a tuic password is case-sensitive
+    if u.password is not None:
+        credential += ":" + urllib.parse.unquote(u.password)
+    transport = _first(params, "type", "network").lower() or "tcp"
+    path = _first(params, "path", "serviceName")
+    sni = _first(params, "sni", "peer", "host")
+    return ConfigIdentity(protocol, _host(u.hostname), port, credential, transport, path, _host(sni))
+
+
+def _parse_ss(body: str) -> Optional[ConfigIdentity]:
+    body = body.split("#", 1)[0]
+    query = ""
+    if "?" in body:
+        body, query = body.split("?", 1)
+    if "@" not in body:
+        # legacy form: base64(method:password@host:port)
+        body = _b64decode(body.rstrip("/"))
+    userinfo, _, hostport = body.rpartition("@")
+    if ":" not in userinfo:
+        # SIP002: base64(method:password)@host:port
+        userinfo = _b64decode(urllib.parse.unquote(userinfo))
+    u = urllib.parse.urlsplit("//" + hostport.rstrip("/"))
+    if not u.hostname or u.port is None or ":" not in userinfo:
+        return None
+    plugin = _first(urllib.parse.parse_qs(query), "plugin")
+    return ConfigIdentity("ss", _host(u.hostname), u.port, userinfo, plugin.split(";", 1)[0])
+
+
+def _parse_ssr(body: str) -> Optional[ConfigIdentity]:
+    # base64(host:port:protocol:method:obfs:base64(password)/?params)
+    decoded = _b64decode(body.split("#", 1)[0])
+    main, _, query = decoded.partition("/?")
+    host, port, proto, method, obfs, password = main.rsplit(":", 5)
+    port = _port(port)
+    if not host or port is None:
+        return None
+    params = urllib.parse.parse_qs(query)
+    obfs_param = _first(params, "obfsparam")
+    credential = f"{proto}:{method}:{_b64decode(password)}"
+    return ConfigIdentity("ssr", _host(host), port, credential, obfs,
+                          sni=_host(_b64decode(obfs_param)) if obfs_param else "")
+
+
+def parse_identity(uri: str) -> Optional[ConfigIdentity]:
+    """Parse a config URI into its ConfigIdentity, or None if it is malformed."""
+    uri = uri.strip()
+    scheme, sep, body = uri.partition("://")
+    if not sep:
+        return None
+    scheme = scheme.lower()
+    protocol = PROTOCOL_ALIASES.get(scheme, scheme)
+    try:
+        if protocol == "vmess":
+            return _parse_vmess(body)
+        if protocol in ("vless", "trojan", "hysteria2", "tuic"):
+            return _parse_url(protocol, uri)
+        if protocol == "ss":
+            return _parse_ss(body)
+        if protocol == "ssr":
+            return _parse_ssr(body)
+    except Exception:
+        return None
+    return None
+
+
+def canonical_key(uri: str) -> str:
+    """Identity key for `uri`; unparseable URIs fall back to a hash of the
+    URI without its #remark, so they still dedupe exact re-posts."""
+    ident = parse_identity(uri)
+    if ident is not None:
+        return ident.key
+    raw = uri.strip().split("#", 1)[0].encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
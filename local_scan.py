@@ -12,12 +12,15 @@ Usage:
   python3 local_scan.py --mode normal     # more thorough, slower
   python3 local_scan.py --skip-download   # ping only (fastest)
   python3 local_scan.py --no-pull         # skip git pull
+  python3 local_scan.py --rescan-dead     # also test configs that keep failing
+
+After a complete scan, every config on an unreachable IP gets a strike in
+output/dead.bloom (dead_filter.py).  Configs with repeated strikes are
+skipped by later scans and dropped by collector.py.
 """
 
 import argparse
 import asyncio
-import base64
-import json
 import os
 import signal
 import subprocess
@@ -27,8 +30,9 @@ import time
 REPO_ROOT  = os.path.dirname(os.path.abspath(__file__))
 INPUT_FILE = os.path.join(REPO_ROOT, "output", "sub.txt")
 OUT_SUB    = os.path.join(REPO_ROOT, "output", "sub.txt")
-OUT_B64    = os.path.join(REPO_ROOT, "output", "base64.txt")
 OUT_STATS  = os.path.join(REPO_ROOT, "output", "stats.json")
+DEAD_FILE  = os.path.join(REPO_ROOT, "output", "dead.bloom")
+DEAD_MIN_ALIVE_SHARE = 0.05  # below this share of alive IPs the network, not the configs, is down
 
 sys.path.insert(0, REPO_ROOT)
 try:
@@ -43,6 +47,10 @@ except ImportError as e:
     print(f"[!] Make sure scanner.py is in the same directory.")
     sys.exit(1)
 
+from dead_filter import DeadFilter
+from identity import canonical_key
+from output_writer import write_json_atomic, write_subscription
+
 
 def _fmt(secs: float) -> str:
     m, s = divmod(int(secs), 60)
@@ -71,29 +79,35 @@ def git_pull():
         print(f"[!] git pull error: {e} — skipping.")
 
 
-def write_outputs(uris: list, elapsed: float, total_input: int):
-    os.makedirs(os.path.dirname(OUT_SUB), exist_ok=True)
+def record_dead(st) -> int:
+    """Add a strike for every config whose IP failed this scan; returns how many."""
+    dead = DeadFilter.load(DEAD_FILE)
+    dead.rotate()
+    keys = {canonical_key(uri) for r in st.res.values() if not r.alive for uri in r.uris}
+    for key in keys:
+        dead.record_failure(key)
+    dead.save(DEAD_FILE)
+    return len(keys)
 
-    plain   = "\n".join(uris)
-    encoded = base64.b64encode(plain.encode("utf-8")).decode("utf-8")
 
-    with open(OUT_SUB, "w", encoding="utf-8") as f:
-        f.write(plain + "\n")
+def write_outputs(uris: list, elapsed: float, total_input: int):
+    out_dir = os.path.dirname(OUT_SUB)
+    count, changed = write_subscription(uris, out_dir, written_by="local", trailing_newline=True)
 
-    with open(OUT_B64, "w", encoding="utf-8") as f:
-        f.write(encoded + "\n")
+    if not changed:
+        print(f"\n[OK] {count} alive configs — same set as output/sub.txt, nothing rewritten")
+        return
 
     stats = {
         "last_scan":       time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
         "scanned_by":      "local",
-        "config_count":    len(uris),
+        "config_count":    count,
         "total_tested":    total_input,
         "elapsed_seconds": round(elapsed, 1),
     }
-    with open(OUT_STATS, "w", encoding="utf-8") as f:
-        json.dump(stats, f, indent=2, ensure_ascii=False)
+    write_json_atomic(OUT_STATS, stats, indent=2, ensure_ascii=False)
 
-    print(f"\n[OK] {len(uris)} alive configs saved -> output/sub.txt")
+    print(f"\n[OK] {count} alive configs saved -> output/sub.txt")
     print(f"[OK] output/base64.txt updated")
     print(f"[OK] output/stats.json updated")
 
@@ -111,7 +125,7 @@ async def run(args):
     if args.skip_download:
         st.rounds = []
 
-    st.configs = load_input(INPUT_FILE)
+    st.configs = load_input(INPUT_FILE, None if args.rescan_dead else DEAD_FILE)
     total_input = len(st.configs)
     print(f"[*] Loaded {total_input} configs")
 
@@ -193,6 +207,13 @@ async def run(args):
     signal.signal(signal.SIGINT, old_sigint)
     elapsed = time.monotonic() - start
     print(f"\n\n[OK] Scan complete — {_fmt(elapsed)} | alive: {st.alive_n}/{len(st.ips)}")
+    if not st.interrupted:
+        if st.alive_n >= max(1, DEAD_MIN_ALIVE_SHARE * len(st.ips)):
+            struck = record_dead(st)
+            print(f"[*] {struck} failed configs recorded in output/dead.bloom")
+        else:
+            print(f"[!] Only {st.alive_n}/{len(st.ips)} IPs alive — likely a network problem, "
+                  "no dead strikes recorded")
 
     # Results
     alive_results = sorted_alive(st, "score")
@@ -243,6 +264,8 @@ def main():
                    help="Ping only — no download speed test")
     p.add_argument("--no-pull", action="store_true",
                    help="Skip git pull")
+    p.add_argument("--rescan-dead", action="store_true",
+                   help="Also scan configs that failed repeatedly (ignore output/dead.bloom)")
     p.add_argument("--workers",       type=int,   default=LATENCY_WORKERS)
     p.add_argument("--speed-workers", type=int,   default=SPEED_WORKERS)
     p.add_argument("--timeout",       type=float, default=LATENCY_TIMEOUT)
@@ -0,0 +1,240 @@
+"""
+output_writer.py — change-aware, atomic writer for output/ files
+
+write_subscription() streams URIs into temporary sub.txt / base64.txt files
+while computing an order-independent digest of the config set.  If the
+digest matches the one in output/manifest.json the temporaries are dropped
+and nothing in output/ changes (so there is nothing to commit); otherwise the
+files are swapped in with os.replace() and the manifest is rewritten.
+
+manifest.json is small on purpose: index.html and clients can read counts
+and hashes from it without downloading the subscription itself.
+
+publish_delta() writes output/delta/<version>.json with the configs added and
+removed since the previous publish (keyed by canonical identity; a key whose
+URI changed is listed in `added` again with the new URI) and keeps a
+rolling output/delta/index.json of recent versions, so clients can sync by
+applying deltas instead of re-downloading sub.txt.
+
+EndpointGroups / write_endpoints() produce the optional output/endpoints.json
+sidecar: the same configs grouped by (host, port, sni), stamped with the
+subscription digest, so scanner.load_input can take addresses from it
+without parsing every URI.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from identity import parse_identity
+
+MANIFEST = "manifest.json"
+ENDPOINTS = "endpoints.json"
+DELTA_DIR = "delta"
+DELTA_KEEP = 24  # versions listed in delta/index.json (3 days at one run per 3h)
+_MASK = (1 << 128) - 1
+
+
+class B64StreamEncoder:
+    """Incremental base64: output is identical to b64encode() of all chunks joined."""
+
+    def __init__(self, out):
+        self.out = out
+        self.tail = b""
+
+    def write(self, data: bytes):
+        data = self.tail + data
+        cut = len(data) - len(data) % 3
+        self.tail = data[cut:]
+        if cut:
+            self.out.write(base64.b64encode(data[:cut]).decode("ascii"))
+
+    def close(self):
+        if self.tail:
+            self.out.write(base64.b64encode(self.tail).decode("ascii"))
+            self.tail = b""
+
+
+class SetDigest:
+    """Order-independent digest: sum of per-item SHA-256 prefixes mod 2**128."""
+
+    def __init__(self):
+        self.acc = 0
+        self.count = 0
+
+    def add(self, item: str):
+        h = hashlib.sha256(item.encode("utf-8")).digest()
+        self.acc = (self.acc + int.from_bytes(h[:16], "big")) & _MASK
+        self.count += 1
+
+    def hexdigest(self) -> str:
+        return f"{self.count:x}-{self.acc:032x}"
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_json_atomic(path: str, data, **kw):
+    """Write JSON via a temp file + rename, creating the directory if needed."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, **kw)
+    os.replace(tmp, path)
+
+
+def load_manifest(out_dir: str) -> dict:
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_subscription(
+    uris: Iterable[str],
+    out_dir: str = "output",
+    written_by: str = "collector",
+    trailing_newline: bool = False,
+    extra: Optional[dict] = None,
+) -> Tuple[int, bool]:
+    """Stream `uris` into out_dir/sub.txt and base64.txt.
+
+    Returns (count, changed).  When the config set equals the one recorded in
+    the manifest, existing files are left untouched and changed is False.
+    `extra` is merged into the manifest when it is rewritten.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    sub_path = os.path.join(out_dir, "sub.txt")
+    b64_path = os.path.join(out_dir, "base64.txt")
+    sub_tmp, b64_tmp = f"{sub_path}.tmp", f"{b64_path}.tmp"
+
+    digest = SetDigest()
+    try:
+        with open(sub_tmp, "w", encoding="utf-8") as sub, open(b64_tmp, "w", encoding="utf-8") as b64:
+            enc = B64StreamEncoder(b64)
+            for uri in uris:
+                line = uri if digest.count == 0 else "\n" + uri
+                sub.write(line)
+                enc.write(line.encode("utf-8"))
+                digest.add(uri)
+            enc.close()
+            if trailing_newline:
+                sub.write("\n")
+                b64.write("\n")
+    except BaseException:
+        for tmp in (sub_tmp, b64_tmp):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+
+    old = load_manifest(out_dir)
+    if (old.get("digest") == digest.hexdigest()
+            and os.path.exists(sub_path) and os.path.exists(b64_path)):
+        os.remove(sub_tmp)
+        os.remove(b64_tmp)
+        return digest.count, False
+
+    os.replace(sub_tmp, sub_path)
+    os.replace(b64_tmp, b64_path)
+    manifest = {
+        "updated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "written_by": written_by,
+        "config_count": digest.count,
+        "digest": digest.hexdigest(),
+        "files": {
+            name: {"bytes": os.path.getsize(path), "sha256": file_sha256(path)}
+            for name, path in (("sub.txt", sub_path), ("base64.txt", b64_path))
+        },
+    }
+    if extra:
+        manifest.update(extra)
+    write_json_atomic(os.path.join(out_dir, MANIFEST), manifest, indent=2, ensure_ascii=False)
+    return digest.count, True
+
+
+def publish_delta(index, out_dir: str = "output", keep: int = DELTA_KEEP) -> Optional[dict]:
+    """Write the delta between this run's configs in `index` (a ConfigIndex)
+    and the previously published set, then mark this run as published.
+
+    If the index's published version is not the latest in delta/index.json
+    (e.g. the state cache was lost) the delta is a reset: `added` lists every
+    config and clients must resync from sub.txt.
+    """
+    delta_dir = os.path.join(out_dir, DELTA_DIR)
+    os.makedirs(delta_dir, exist_ok=True)
+    index_path = os.path.join(delta_dir, "index.json")
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            rolling = json.load(f)
+    except (OSError, ValueError):
+        rolling = {"latest": 0, "versions": []}
+
+    latest = rolling.get("latest", 0)
+    version = latest + 1
+    reset = latest == 0 or index.published_version() != latest
+    if reset:
+        index.reset_published()
+    added, removed = index.diff_published()
+
+    entry = {
+        "version": version,
+        "base": None if reset else latest,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "reset": reset,
+        "digest": load_manifest(out_dir).get("digest", ""),
+        "added": len(added),
+        "removed": len(removed),
+        "file": f"{version}.json",
+    }
+    delta = dict(entry, added=[[k, uri] for k, uri in added], removed=removed)
+    del delta["file"]
+    write_json_atomic(os.path.join(delta_dir, entry["file"]), delta, ensure_ascii=False, separators=(",", ":"))
+
+    versions = rolling.get("versions", []) + [entry]
+    for old in versions[:-keep]:
+        try:
+            os.remove(os.path.join(delta_dir, old["file"]))
+        except OSError:
+            pass
+    rolling = {"latest": version, "versions": versions[-keep:]}
+    write_json_atomic(index_path, rolling, indent=2, ensure_ascii=False)
+
+    index.mark_published(version)
+    return entry
+
+
+class EndpointGroups:
+    """Configs grouped by the endpoint a client connects to: (host, port, sni)."""
+
+    def __init__(self):
+        self.groups: Dict[Tuple[str, int, str], List[str]] = {}
+
+    def collect(self, uris: Iterable[str]) -> Iterator[str]:
+        """Pass `uris` through, grouping each one on the way."""
+        for uri in uris:
+            ident = parse_identity(uri)
+            if ident is not None:
+                self.groups.setdefault((ident.host, ident.port, ident.sni), []).append(uri)
+            yield uri
+
+
+def write_endpoints(endpoints: EndpointGroups, out_dir: str = "output") -> int:
+    """Write out_dir/endpoints.json for the subscription just written
+    (largest groups first).  Returns the number of endpoints."""
+    groups = sorted(endpoints.groups.items(), key=lambda item: -len(item[1]))
+    data = {
+        "digest": load_manifest(out_dir).get("digest", ""),
+        "endpoints": [{"host": host, "port": port, "sni": sni, "configs": uris}
+                      for (host, port, sni), uris in groups],
+    }
+    write_json_atomic(os.path.join(out_dir, ENDPOINTS), data, ensure_ascii=False, separators=(",", ":"))
+    return len(groups)
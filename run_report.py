@@ -0,0 +1,141 @@
+"""
+run_report.py — per-source instrumentation for collector.py
+
+Every channel, subscription URL and the configs/ folder gets a SourceStats
+record during a run.  write_report() dumps them to output/report.json, and
+SourceHistory keeps an exponentially weighted summary per source in
+state/source_history.json, which the fetch scheduler uses to start the most
+productive sources first and to time-box the ones that keep yielding nothing.
+"""
+
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from output_writer import write_json_atomic
+
+EWMA_ALPHA = 0.3        # weight of the newest run in the history averages
+LOW_YIELD_RUNS = 3      # consecutive zero-yield runs before a source is time-boxed
+LOW_YIELD_TIMEOUT = 6.0  # seconds allowed to a time-boxed source
+POLL_START = 1800.0     # first poll interval of a source in collector --daemon
+POLL_MIN = 300.0
+POLL_MAX = 6 * 3600.0
+
+
+@dataclass
+class SourceStats:
+    source: str
+    kind: str                   # "telegram", "sub" or "folder"
+    status: str = ""            # HTTP status, "cached", "timeout", "deadline", "skipped", "error: ..."
+    latency_s: float = 0.0      # wall time spent in HTTP requests
+    bytes: int = 0
+    raw_count: int = 0
+    unique_count: int = 0       # configs this source contributed after dedup
+    stale_count: int = 0        # configs dropped as older than the freshness window
+    rejected_count: int = 0     # configs failing validator.check_config
+    parse_errors: int = 0       # base64 blocks / bodies that failed to decode
+    scan_s: float = 0.0         # regex and line-scan time
+    b64_s: float = 0.0          # base64 decode time
+    timeout_s: float = 0.0      # per-request timeout the scheduler assigned
+
+
+class SourceHistory:
+    """EWMA of latency and unique yield per source, persisted between runs."""
+
+    def __init__(self, data: Dict[str, dict]):
+        self.data = data
+
+    def score(self, source: str) -> float:
+        """Unique configs per second of fetch time; unknown sources rank first."""
+        h = self.data.get(source)
+        if not h:
+            return float("inf")
+        return h.get("unique", 0.0) / max(h.get("latency", 0.0), 0.5)
+
+    def is_low_yield(self, source: str) -> bool:
+        return self.data.get(source, {}).get("zero_runs", 0) >= LOW_YIELD_RUNS
+
+    def timeout_for(self, source: str, default: float) -> float:
+        return min(default, LOW_YIELD_TIMEOUT) if self.is_low_yield(source) else default
+
+    def order(self, sources: Iterable[str]) -> List[str]:
+        """Sources sorted most valuable first (stable for equal scores)."""
+        return sorted(sources, key=self.score, reverse=True)
+
+    def update(self, stats: SourceStats):
+        if not stats.status or stats.status == "skipped":
+            return
+        h = self.data.setdefault(stats.source, {})
+        for name, value in (("latency", stats.latency_s), ("unique", float(stats.unique_count)),
+                            ("bytes", float(stats.bytes))):
+            old = h.get(name)
+            h[name] = round(value if old is None else old + EWMA_ALPHA * (value - old), 3)
+        h["runs"] = h.get("runs", 0) + 1
+        h["zero_runs"] = 0 if stats.unique_count else h.get("zero_runs", 0) + 1
+        h["last_run"] = int(time.time())
+
+
+class PollSchedule:
+    """Per-source poll intervals for collector --daemon.
+
+    After each poll the interval halves if the source's config set changed
+    since the previous poll and grows by half if it did not, within
+    [POLL_MIN, POLL_MAX]; failed polls are retried after POLL_MIN.
+    """
+
+    def __init__(self, start: float = POLL_START, low: float = POLL_MIN, high: float = POLL_MAX):
+        self.start, self.low, self.high = start, low, high
+        self.intervals: Dict[str, float] = {}
+        self.next_due: Dict[str, float] = {}
+        self._fingerprints: Dict[str, int] = {}
+
+    def due(self, source: str, now: float) -> bool:
+        return self.next_due.get(source, 0.0) <= now
+
+    def record(self, source: str, configs: Sequence, now: float) -> bool:
+        """Schedule the next poll after a successful one; returns True if the configs changed."""
+        fp = hash(frozenset(c[0] for c in configs))
+        changed = self._fingerprints.get(source) != fp
+        self._fingerprints[source] = fp
+        interval = self.intervals.get(source)
+        if interval is None:
+            interval = self.start
+        elif changed:
+            interval = max(self.low, interval / 2)
+        else:
+            interval = min(self.high, interval * 1.5)
+        self.intervals[source] = interval
+        self.next_due[source] = now + interval
+        return changed
+
+    def failed(self, source: str, now: float):
+        self.next_due[source] = now + self.low
+
+    def next_wakeup(self, sources: Iterable[str], now: float) -> float:
+        """Seconds until the first of `sources` is due (POLL_MIN if there are none)."""
+        return max(0.0, min((self.next_due.get(s, 0.0) for s in sources), default=now + self.low) - now)
+
+
+def write_report(path: str, stats: List[SourceStats], started: float, elapsed: float,
+                 rejects: Optional[Dict[str, int]] = None):
+    """Write the machine-readable run report (atomic replace).  `rejects`
+    maps validator reason codes to counts."""
+    report = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+        "elapsed_seconds": round(elapsed, 2),
+        "totals": {
+            "sources": len(stats),
+            "raw": sum(s.raw_count for s in stats),
+            "unique": sum(s.unique_count for s in stats),
+            "stale": sum(s.stale_count for s in stats),
+            "rejected": sum(s.rejected_count for s in stats),
+            "bytes": sum(s.bytes for s in stats),
+            "parse_errors": sum(s.parse_errors for s in stats),
+        },
+        "rejects": dict(sorted((rejects or {}).items())),
+        "sources": [
+            {k: round(v, 4) if isinstance(v, float) else v for k, v in asdict(s).items()}
+            for s in stats
+        ],
+    }
+    write_json_atomic(path, report, indent=2, ensure_ascii=False)
@@ -30,9 +30,13 @@ import asyncio
 import argparse
 import base64
 import csv
+import bisect
 import glob as globmod
 import ipaddress
+import itertools
+import math
 import json
+import multiprocessing
 import os
 import random
 import re
@@ -46,7 +50,7 @@ import urllib.parse
 import urllib.request
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
 VERSION = "1.0"
@@ -681,7 +685,67 @@ def parse_config(uri: str) -> Optional[ConfigEntry]:
     return parse_vless(uri) or parse_vmess(uri)
 
 
-def load_input(path: str) -> List[ConfigEntry]:
+def _drop_dead(configs: List[ConfigEntry], filter_path: str) -> List[ConfigEntry]:
+    """Remove configs whose identity repeatedly failed earlier scans.
+
+    Uses dead_filter.py / identity.py from the collector repo, imported only
+    when a filter is requested so the scanner itself stays stdlib-only.
+    """
+    try:
+        from dead_filter import DeadFilter
+        from identity import canonical_key
+    except ImportError as e:
+        print(f"  Dead filter unavailable ({e}), scanning everything")
+        return configs
+    dead = DeadFilter.load(filter_path)
+    kept = [c for c in configs
+            if not c.original_uri or not dead.is_dead(canonical_key(c.original_uri))]
+    if len(kept) < len(configs):
+        print(f"  Skipped {len(configs) - len(kept)} configs that failed repeatedly ({filter_path})")
+    return kept
+
+
+def _endpoint_configs(data: dict) -> List[ConfigEntry]:
+    """ConfigEntry list from a collector endpoints.json (configs grouped by
+    host, port and SNI): addresses come from the groups, URIs are not parsed."""
+    out: List[ConfigEntry] = []
+    for ep in data.get("endpoints", []):
+        host = ep.get("host", "")
+        for uri in ep.get("configs", []):
+            if host and uri.startswith(("vless://", "vmess://")):
+                name = urllib.parse.unquote(uri.rsplit("#", 1)[1]) if "#" in uri else ""
+                out.append(ConfigEntry(address=host, name=name, original_uri=uri))
+    return out
+
+
+def _endpoints_sidecar(path: str) -> Optional[dict]:
+    """The endpoints.json next to a collector sub.txt, if it was written for
+    the same config set (same digest as manifest.json), else None."""
+    if os.path.basename(path) != "sub.txt":
+        return None
+    folder = os.path.dirname(os.path.abspath(path))
+    try:
+        with open(os.path.join(folder, "manifest.json"), "r", encoding="utf-8") as f:
+            digest = json.load(f).get("digest")
+        with open(os.path.join(folder, "endpoints.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError, AttributeError):
+        return None
+    if not digest or not isinstance(data, dict) or data.get("digest") != digest:
+        return None
+    return data
+
+
+def load_input(path: str, dead_filter: Optional[str] = None) -> List[ConfigEntry]:
+    """Configs from a domains.json, a collector endpoints.json or a file of URIs.
+    For a collector sub.txt with an up-to-date endpoints.json beside it, the
+    sidecar is read instead.  With `dead_filter` (a dead_filter.py file, e.g.
+    output/dead.bloom) known-dead configs are skipped."""
+    sidecar = _endpoints_sidecar(path)
+    if sidecar is not None:
+        out = _endpoint_configs(sidecar)
+        print(f"  Using {len(out)} configs from endpoints.json next to {path}")
+        return _drop_dead(out, dead_filter) if dead_filter else out
     try:
         with open(path, "r", encoding="utf-8") as f:
             raw = f.read()
@@ -690,6 +754,9 @@ def load_input(path: str) -> List[ConfigEntry]:
         return []
     try:
         data = json.loads(raw)
+        if isinstance(data, dict) and "endpoints" in data:
+            out = _endpoint_configs(data)
+            return _drop_dead(out, dead_filter) if dead_filter else out
         if isinstance(data, dict) and "data" in data:
             data = data["data"]
         out: List[ConfigEntry] = []
@@ -708,6 +775,8 @@ def load_input(path: str) -> List[ConfigEntry]:
         c = parse_config(ln)
         if c:
             out.append(c)
+    if dead_filter:
+        out = _drop_dead(out, dead_filter)
     return out
 
 
@@ -820,17 +889,123 @@ def _split_to_24s(subnets: List[str]) -> list:
     return blocks
 
 
+def _host_count(net: ipaddress.IPv4Network) -> int:
+    """len(list(net.hosts())) without building the list."""
+    return net.num_addresses - 2 if net.prefixlen < 31 else net.num_addresses
+
+
+def _mix64(x: int) -> int:
+    """64-bit integer hash (splitmix64 finalizer)."""
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+    return x ^ (x >> 31)
+
+
+def _permutation(n: int, rng: random.Random) -> Iterator[int]:
+    """Every integer in [0, n) exactly once, in pseudo-random order, O(1) memory.
+
+    A full-period LCG over [0, 2**k) (Hull-Dobell: c odd, a = 1 mod 4) is
+    passed through an xorshift-multiply bijection to hide the LCG's weak low
+    bits; values >= n are skipped (cycle walking, under 2 steps per value).
+    """
+    if n <= 0:
+        return
+    bits = max(2, (n - 1).bit_length())
+    mask = (1 << bits) - 1
+    half = max(1, bits // 2)
+    a = (rng.getrandbits(bits) & ~3 | 1) & mask or 5
+    c = rng.getrandbits(bits) | 1
+    mul = rng.getrandbits(bits) | 1
+    x = rng.getrandbits(bits)
+    for _ in range(mask + 1):
+        x = (a * x + c) & mask
+        y = x ^ (x >> half)
+        y = (y * mul) & mask
+        y ^= y >> half
+        if y < n:
+            yield y
+
+
+def iter_cf_probes(
+    subnets: List[str],
+    sample_per_24: int = 0,
+    ports: Optional[List[int]] = None,
+    seed: Optional[int] = None,
+    shard: int = 0,
+    shards: int = 1,
+) -> Iterator[Tuple[str, int]]:
+    """(ip, port) probes over CIDR subnets in random order, generated lazily.
+
+    Probe i of the clean IP scan maps to (/24 block, host slot, port) through
+    prefix sums over the blocks, and the order is a full-period permutation
+    of [0, total) (_permutation), so nothing per IP is held in memory.  With
+    sample_per_24 > 0 each /24 contributes that many hosts, picked by a
+    per-block affine permutation of its host range.  The same `seed` gives
+    the same probes; `shard`/`shards` yield every shards-th probe of that
+    sequence starting at `shard` (see scan_clean_sharded).
+    """
+    ports = ports or [443]
+    seed = random.getrandbits(64) if seed is None else seed
+    firsts: List[int] = []
+    sizes: List[int] = []
+    counts: List[int] = []
+    starts: List[int] = []
+    total_hosts = 0
+    for net in _split_to_24s(subnets):
+        n = _host_count(net)
+        k = min(sample_per_24, n) if sample_per_24 > 0 else n
+        if k <= 0:
+            continue
+        firsts.append(int(net.network_address) + (1 if net.prefixlen < 31 else 0))
+        sizes.append(n)
+        counts.append(k)
+        starts.append(total_hosts)
+        total_hosts += k
+    n_ports = len(ports)
+    order = _permutation(total_hosts * n_ports, random.Random(seed))
+    inet_ntoa = socket.inet_ntoa
+    for idx in itertools.islice(order, shard, None, shards):
+        slot, port_i = divmod(idx, n_ports)
+        b = bisect.bisect_right(starts, slot) - 1
+        j = slot - starts[b]
+        n = sizes[b]
+        if counts[b] < n:
+            h = _mix64(seed ^ firsts[b])
+            step = h % n or 1
+            while math.gcd(step, n) != 1:
+                step += 1
+            j = (step * j + (h >> 32)) % n
+        yield inet_ntoa((firsts[b] + j).to_bytes(4, "big")), ports[port_i]
+
+
 def generate_cf_ips(subnets: List[str], sample_per_24: int = 0) -> List[str]:
-    """Generate IPs from CIDR subnets. sample_per_24=0 means all hosts."""
-    blocks = _split_to_24s(subnets)
-    random.shuffle(blocks)
-    ips = []
-    for net in blocks:
-        hosts = [str(ip) for ip in net.hosts()]
-        if sample_per_24 > 0 and sample_per_24 < len(hosts):
-            hosts = random.sample(hosts, sample_per_24)
-        ips.extend(hosts)
-    return ips
+    """Generate IPs from CIDR subnets. sample_per_24=0 means all hosts.
+    Builds the whole list; the clean IP scan uses iter_cf_probes() instead."""
+    return [ip for ip, _ in iter_cf_probes(subnets, sample_per_24)]
+
+
+_ssl_contexts: Dict[Tuple[bool, Tuple[str, ...]], ssl.SSLContext] = {}
+HTTP_ALPN = ("http/1.1",)
+
+
+def ssl_context(verify: bool = False, alpn: Tuple[str, ...] = ()) -> ssl.SSLContext:
+    """Shared client SSLContext, created once per (verify, alpn) variant.
+
+    Building a context loads the CA store, which cost more than the probe
+    itself when done per IP; contexts hold no per-connection state, so all
+    probes reuse them.  verify=False skips certificate and hostname checks.
+    """
+    key = (verify, alpn)
+    ctx = _ssl_contexts.get(key)
+    if ctx is None:
+        ctx = ssl.create_default_context()
+        if not verify:
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+        if alpn:
+            ctx.set_alpn_protocols(list(alpn))
+        _ssl_contexts[key] = ctx
+    return ctx
 
 
 async def _tls_probe(
@@ -840,9 +1015,7 @@ async def _tls_probe(
     Returns (latency_ms, is_cloudflare, error)."""
     w = None
     try:
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
+        ctx = ssl_context(alpn=HTTP_ALPN if validate else ())
         t0 = time.monotonic()
         r, w = await asyncio.wait_for(
             asyncio.open_connection(ip, port, ssl=ctx, server_hostname=sni),
@@ -895,23 +1068,34 @@ class CleanScanState:
 
 
 async def scan_clean_ips(
-    ips: List[str],
+    ips: Optional[List[str]],
     sni: str = "speed.cloudflare.com",
     workers: int = 500,
     timeout: float = 3.0,
     validate: bool = True,
     cs: Optional[CleanScanState] = None,
     ports: Optional[List[int]] = None,
+    on_found: Optional[Callable[[str, float], None]] = None,
+    probes: Optional[Iterable[Tuple[str, int]]] = None,
+    total: int = 0,
 ) -> List[Tuple[str, float]]:
     """Scan IPs for TLS + optional CF validation. Returns [(addr, latency_ms)] sorted.
-    addr is 'ip' for port 443, or 'ip:port' for other ports."""
+    addr is 'ip' for port 443, or 'ip:port' for other ports.
+    on_found(addr, latency_ms) is called for each clean IP as it is found.
+    Instead of `ips` × `ports`, `probes` can supply (ip, port) pairs lazily
+    (iter_cf_probes), with their count as `total`."""
     if ports is None:
         ports = [443]
     sem = asyncio.Semaphore(workers)
     results: List[Tuple[str, float]] = []
     lock = asyncio.Lock()
 
-    total_probes = len(ips) * len(ports)
+    if probes is None:
+        # Build flat list of (ip, port) pairs
+        probe_list = [(ip, p) for ip in ips for p in ports]
+        random.shuffle(probe_list)  # spread ports across batches for better coverage
+        probes, total = probe_list, len(probe_list)
+    total_probes = total
     if cs:
         cs.total = total_probes
         cs.done = 0
@@ -927,6 +1111,8 @@ async def scan_clean_ips(
             lat, is_cf, _err = await _tls_probe(ip, sni, timeout, validate, port)
             if lat > 0 and is_cf:
                 addr = ip if port == 443 else f"{ip}:{port}"
+                if on_found:
+                    on_found(addr, lat)
                 async with lock:
                     results.append((addr, lat))
                     if cs:
@@ -937,15 +1123,11 @@ async def scan_clean_ips(
             if cs:
                 cs.done += 1
 
-    # Build flat list of (ip, port) pairs
-    probes = [(ip, p) for ip in ips for p in ports]
-    random.shuffle(probes)  # spread ports across batches for better coverage
-
     BATCH = 50_000
-    for i in range(0, len(probes), BATCH):
+    it = iter(probes)
+    for batch in iter(lambda: list(itertools.islice(it, BATCH)), []):
         if cs and cs.interrupted:
             break
-        batch = probes[i : i + BATCH]
         tasks = [asyncio.ensure_future(probe(ip, port)) for ip, port in batch]
         try:
             await asyncio.gather(*tasks, return_exceptions=True)
@@ -960,6 +1142,139 @@ async def scan_clean_ips(
     return results
 
 
+CLEAN_REPORT_EVERY = 0.5  # seconds between progress messages from a --procs worker
+
+
+def clean_probe_count(subnets: List[str], sample_per_24: int = 0, ports: Optional[List[int]] = None) -> int:
+    """Number of probes iter_cf_probes() yields."""
+    hosts = sum(min(sample_per_24, n) if sample_per_24 > 0 else n
+                for n in (_host_count(b) for b in _split_to_24s(subnets)))
+    return hosts * len(ports or [443])
+
+
+async def _clean_shard(shard: int, shards: int, seed: int, subnets: List[str], sample_per_24: int,
+                       sni: str, workers: int, timeout: float, validate: bool, ports: List[int],
+                       queue, stop):
+    total = clean_probe_count(subnets, sample_per_24, ports)
+    total = total // shards + (shard < total % shards)
+    cs = CleanScanState()
+    found: List[Tuple[str, float]] = []
+    task = asyncio.ensure_future(scan_clean_ips(
+        None, sni=sni, workers=workers, timeout=timeout, validate=validate, cs=cs, ports=ports,
+        on_found=lambda addr, lat: found.append((addr, lat)),
+        probes=iter_cf_probes(subnets, sample_per_24, ports, seed, shard, shards), total=total,
+    ))
+    while not task.done():
+        await asyncio.wait([task], timeout=CLEAN_REPORT_EVERY)
+        if stop.is_set():
+            cs.interrupted = True
+        batch, found[:] = found[:], []
+        queue.put(("tick", shard, cs.done, cs.total, batch))
+    queue.put(("done", shard, cs.done, cs.total, found))
+
+
+def _clean_shard_main(shard: int, shards: int, seed: int, subnets: List[str], sample_per_24: int,
+                      sni: str, workers: int, timeout: float, validate: bool, ports: List[int],
+                      queue, stop):
+    """Entry point of a --procs worker process: scan one shard of the probe sequence."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent stops workers through the stop event
+    try:
+        asyncio.run(_clean_shard(shard, shards, seed, subnets, sample_per_24, sni, workers, timeout,
+                                 validate, ports, queue, stop))
+    except Exception as e:
+        queue.put(("error", shard, 0, 0, str(e)[:200]))
+
+
+async def scan_clean_sharded(
+    subnets: List[str],
+    procs: int,
+    sample_per_24: int = 0,
+    sni: str = "speed.cloudflare.com",
+    workers: int = 500,
+    timeout: float = 3.0,
+    validate: bool = True,
+    cs: Optional[CleanScanState] = None,
+    ports: Optional[List[int]] = None,
+) -> List[Tuple[str, float]]:
+    """scan_clean_ips over `procs` worker processes (--procs).
+
+    All workers walk the same iter_cf_probes() sequence (shared seed), and
+    worker i takes every procs-th probe from position i, so each one scans a
+    random spread of the /24 blocks.  Each runs scan_clean_ips on its own
+    event loop with workers/procs concurrent probes, so TLS handshakes use
+    every core.  Workers report progress and newly found IPs every
+    CLEAN_REPORT_EVERY seconds; the parent folds them into `cs` and returns
+    the merged results sorted by latency.  Setting cs.interrupted (or
+    cancelling) stops the workers; what they found so far is kept.
+    """
+    ports = ports or [443]
+    cs = cs if cs is not None else CleanScanState()
+    seed = random.getrandbits(64)
+    per_proc = max(1, -(-workers // procs))
+
+    mp = multiprocessing.get_context("spawn")
+    queue, stop = mp.Queue(), mp.Event()
+    results: List[Tuple[str, float]] = []
+    progress: Dict[int, Tuple[int, int]] = {}
+    finished = set()
+    cs.total = clean_probe_count(subnets, sample_per_24, ports)
+    cs.done = cs.found = 0
+    cs.all_results = results
+    cs.start_time = time.monotonic()
+
+    def _drain():
+        while True:
+            try:
+                kind, shard, done, total, payload = queue.get_nowait()
+            except Exception:  # queue.Empty
+                return
+            if kind == "error":
+                _dbg(f"CLEAN: worker {shard} failed: {payload}")
+                finished.add(shard)
+                continue
+            progress[shard] = (done, total)
+            if kind == "done":
+                finished.add(shard)
+            if payload:
+                results.extend(payload)
+                cs.found = len(results)
+                cs.results = sorted(results, key=lambda x: x[1])[:20]
+            cs.done = sum(d for d, _ in progress.values())
+
+    workers_p = [
+        mp.Process(target=_clean_shard_main, daemon=True,
+                   args=(i, procs, seed, subnets, sample_per_24, sni, per_proc, timeout, validate,
+                         ports, queue, stop))
+        for i in range(procs)
+    ]
+    for w in workers_p:
+        w.start()
+    try:
+        while len(finished) < len(workers_p):
+            _drain()
+            if cs.interrupted:
+                stop.set()
+            for i, w in enumerate(workers_p):
+                if i not in finished and not w.is_alive() and w.exitcode:
+                    _drain()
+                    finished.add(i)
+            await asyncio.sleep(0.1)
+    finally:
+        stop.set()
+        deadline = time.monotonic() + 10
+        for w in workers_p:
+            # keep draining: a worker cannot exit while its queue data is unread
+            while w.is_alive() and time.monotonic() < deadline:
+                _drain()
+                w.join(0.1)
+            if w.is_alive():
+                w.terminate()
+        _drain()
+
+    results.sort(key=lambda x: x[1])
+    return results
+
+
 def load_configs_from_args(args) -> Tuple[List[ConfigEntry], str]:
     """Load configs based on CLI args. Returns (configs, source_label)."""
     if getattr(args, "sub", None):
@@ -972,7 +1287,7 @@ def load_configs_from_args(args) -> Tuple[List[ConfigEntry], str]:
         configs = generate_from_template(args.template, addrs)
         return configs, f"{args.input} ({len(addrs)} addresses)"
     if getattr(args, "input", None):
-        configs = load_input(args.input)
+        configs = load_input(args.input, getattr(args, "skip_dead", None))
         return configs, args.input
     return [], ""
 
@@ -1053,9 +1368,15 @@ async def _resolve(e: ConfigEntry, sem: asyncio.Semaphore, counter: List[int]) -
 
 
 async def resolve_all(st: State, workers: int = 100):
+    """Resolve every config's address to an IP, one lookup per distinct address,
+    then group configs by IP into st.ip_map / st.res."""
     sem = asyncio.Semaphore(workers)
     counter = [0]  # mutable for closure
-    total = len(st.configs)
+    pending: Dict[str, List[ConfigEntry]] = defaultdict(list)
+    for c in st.configs:
+        if not c.ip:
+            pending[c.address].append(c)
+    total = len(pending)
 
     async def _progress():
         spin = "|/-\\"
@@ -1072,13 +1393,16 @@ async def resolve_all(st: State, workers: int = 100):
 
     prog_task = asyncio.create_task(_progress())
     try:
-        st.configs = list(await asyncio.gather(*[_resolve(c, sem, counter) for c in st.configs]))
+        await asyncio.gather(*[_resolve(cs[0], sem, counter) for cs in pending.values()])
     finally:
         prog_task.cancel()
         try:
             await prog_task
         except asyncio.CancelledError:
             pass
+    for cs in pending.values():
+        for c in cs[1:]:
+            c.ip = cs[0].ip
     for c in st.configs:
         if c.ip:
             st.ip_map[c.ip].append(c)
@@ -1093,42 +1417,40 @@ async def resolve_all(st: State, workers: int = 100):
 
 
 async def _lat_one(ip: str, sni: str, timeout: float) -> Tuple[float, float, str]:
-    """Measure TCP RTT and full TLS connection time (TCP+TLS handshake)."""
+    """Measure TCP RTT and full TLS connection time (TCP+TLS handshake).
+
+    One connection: the TCP connect is timed, then the same socket is
+    upgraded with loop.start_tls, so each IP costs a single SYN.
+    """
+    loop = asyncio.get_running_loop()
     try:
         t0 = time.monotonic()
-        r, w = await asyncio.wait_for(
-            asyncio.open_connection(ip, 443), timeout=timeout
+        transport, protocol = await asyncio.wait_for(
+            loop.create_connection(asyncio.Protocol, ip, 443), timeout=timeout
         )
         tcp = (time.monotonic() - t0) * 1000
-        w.close()
-        try:
-            await w.wait_closed()
-        except Exception:
-            pass
     except asyncio.TimeoutError:
         return -1, -1, "tcp-timeout"
     except Exception as e:
         return -1, -1, f"tcp:{str(e)[:50]}"
     try:
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        t0 = time.monotonic()
-        r, w = await asyncio.wait_for(
-            asyncio.open_connection(ip, 443, ssl=ctx, server_hostname=sni),
+        ctx = ssl_context()
+        t1 = time.monotonic()
+        tls_transport = await asyncio.wait_for(
+            loop.start_tls(transport, protocol, ctx, server_hostname=sni),
             timeout=timeout,
         )
-        tls_full = (time.monotonic() - t0) * 1000  # full TCP+TLS time
-        w.close()
-        try:
-            await w.wait_closed()
-        except Exception:
-            pass
+        # full TCP+TLS time, as if measured on a fresh connection
+        tls_full = tcp + (time.monotonic() - t1) * 1000
+        transport = tls_transport
         return tcp, tls_full, ""
     except asyncio.TimeoutError:
         return tcp, -1, "tls-timeout"
     except Exception as e:
         return tcp, -1, f"tls:{str(e)[:50]}"
+    finally:
+        # no close_notify exchange: the probe is done with the socket
+        transport.abort()
 
 
 async def phase1(st: State, workers: int, timeout: float):
@@ -1197,7 +1519,7 @@ async def _dl_one(
             w = None
 
     try:
-        ctx = ssl.create_default_context()
+        ctx = ssl_context(verify=True, alpn=HTTP_ALPN)
         t_start = time.monotonic()
         try:
             t0 = t_start
@@ -1207,9 +1529,7 @@ async def _dl_one(
             )
         except ssl.SSLCertVerificationError:
             _cleanup()
-            ctx2 = ssl.create_default_context()
-            ctx2.check_hostname = False
-            ctx2.verify_mode = ssl.CERT_NONE
+            ctx2 = ssl_context(alpn=HTTP_ALPN)
             t0 = time.monotonic()
             r, w = await asyncio.wait_for(
                 asyncio.open_connection(
@@ -1784,8 +2104,9 @@ def _clean_show_results(results: List[Tuple[str, float]], elapsed: str) -> Optio
             return f"template:{tpl}"
 
 
-async def tui_run_clean_finder() -> Optional[Tuple[str, str]]:
-    """Run the clean IP finder flow. Returns (input_method, input_value) or None."""
+async def tui_run_clean_finder(procs: int = 1) -> Optional[Tuple[str, str]]:
+    """Run the clean IP finder flow. Returns (input_method, input_value) or None.
+    With procs > 1 the scan is sharded over that many processes (--procs)."""
 
     mode = _clean_pick_mode()
     if mode is None:
@@ -1805,18 +2126,25 @@ async def tui_run_clean_finder() -> Optional[Tuple[str, str]]:
     _w("\n".join(lines) + "\n")
     _fl()
 
-    ips = generate_cf_ips(CF_SUBNETS, scan_cfg["sample"])
     ports = scan_cfg.get("ports", [443])
-    _dbg(f"CLEAN: Generated {len(ips):,} IPs × {len(ports)} port(s), sample={scan_cfg['sample']}")
-
-    # Run scan with live progress
     cs = CleanScanState()
-    scan_task = asyncio.ensure_future(
-        scan_clean_ips(
-            ips, workers=scan_cfg["workers"], timeout=3.0,
+    total_probes = clean_probe_count(CF_SUBNETS, scan_cfg["sample"], ports)
+    n_ips = total_probes // len(ports)
+    if procs > 1:
+        scan = scan_clean_sharded(
+            CF_SUBNETS, procs, scan_cfg["sample"], workers=scan_cfg["workers"], timeout=3.0,
             validate=scan_cfg["validate"], cs=cs, ports=ports,
         )
-    )
+    else:
+        scan = scan_clean_ips(
+            None, workers=scan_cfg["workers"], timeout=3.0,
+            validate=scan_cfg["validate"], cs=cs, ports=ports,
+            probes=iter_cf_probes(CF_SUBNETS, scan_cfg["sample"], ports), total=total_probes,
+        )
+    _dbg(f"CLEAN: {n_ips:,} IPs × {len(ports)} port(s), sample={scan_cfg['sample']}, procs={procs}")
+
+    # Run scan with live progress
+    scan_task = asyncio.ensure_future(scan)
 
     old_sigint = signal.getsignal(signal.SIGINT)
     def _sig(sig, frame):
@@ -1840,7 +2168,7 @@ async def tui_run_clean_finder() -> Optional[Tuple[str, str]]:
         results = sorted(cs.all_results or cs.results, key=lambda x: x[1])
 
     elapsed = _fmt_elapsed(time.monotonic() - cs.start_time)
-    _dbg(f"CLEAN: Done in {elapsed}. Found {len(results):,} / {len(ips):,}")
+    _dbg(f"CLEAN: Done in {elapsed}. Found {len(results):,} / {n_ips:,}")
 
     # Show results and get user action
     action = _clean_show_results(results, elapsed)
@@ -2603,7 +2931,7 @@ async def run_tui(args):
                 input_method, input_value = pick
 
             if input_method == "find_clean":
-                result = await tui_run_clean_finder()
+                result = await tui_run_clean_finder(getattr(args, "procs", 1))
                 if result is None:
                     _w(A.SHOW)
                     return
@@ -2664,7 +2992,7 @@ async def run_tui(args):
             st.configs = generate_from_template(tpl_uri, addrs)
             st.input_file = f"{addr_path} ({len(addrs)} addresses)"
         else:
-            st.configs = load_input(input_value)
+            st.configs = load_input(input_value, args.skip_dead)
             st.input_file = input_value
 
         if not st.configs:
@@ -2914,22 +3242,29 @@ async def run_headless_clean(args):
             subnets = [s.strip() for s in args.subnets.split(",") if s.strip()]
 
     ports = scan_cfg.get("ports", [443])
+    procs = max(1, getattr(args, "procs", 1) or 1)
     print(f"CF Config Scanner v{VERSION} — Clean IP Finder")
-    print(f"Ranges: {len(subnets)}  |  Sample: {scan_cfg['sample'] or 'all'}  |  Workers: {scan_cfg['workers']}  |  Ports: {', '.join(str(p) for p in ports)}")
+    print(f"Ranges: {len(subnets)}  |  Sample: {scan_cfg['sample'] or 'all'}  |  Workers: {scan_cfg['workers']}  |  Ports: {', '.join(str(p) for p in ports)}"
+          + (f"  |  Processes: {procs}" if procs > 1 else ""))
 
-    ips = generate_cf_ips(subnets, scan_cfg["sample"])
-    total_probes = len(ips) * len(ports)
-    print(f"Scanning {len(ips):,} IPs × {len(ports)} port(s) = {total_probes:,} probes...")
+    total_probes = clean_probe_count(subnets, scan_cfg["sample"], ports)
+    print(f"Scanning {total_probes // len(ports):,} IPs × {len(ports)} port(s) = {total_probes:,} probes...")
 
     cs = CleanScanState()
-    start = time.monotonic()
-
-    scan_task = asyncio.ensure_future(
-        scan_clean_ips(
-            ips, workers=scan_cfg["workers"], timeout=3.0,
+    if procs > 1:
+        scan = scan_clean_sharded(
+            subnets, procs, scan_cfg["sample"], workers=scan_cfg["workers"], timeout=3.0,
             validate=scan_cfg["validate"], cs=cs, ports=ports,
         )
-    )
+    else:
+        scan = scan_clean_ips(
+            None, workers=scan_cfg["workers"], timeout=3.0,
+            validate=scan_cfg["validate"], cs=cs, ports=ports,
+            probes=iter_cf_probes(subnets, scan_cfg["sample"], ports), total=total_probes,
+        )
+    start = time.monotonic()
+
+    scan_task = asyncio.ensure_future(scan)
 
     old_sigint = signal.getsignal(signal.SIGINT)
     def _sig(sig, frame):
@@ -3059,6 +3394,7 @@ Examples:
   %(prog)s -i configs.txt --top 0                   Export ALL sorted
   %(prog)s -i configs.txt --no-tui -o results.csv   Headless
   %(prog)s --find-clean --no-tui                     Find clean CF IPs (headless)
+  %(prog)s --find-clean --no-tui --clean-mode full --procs 4  Clean IP scan on 4 cores
   %(prog)s --find-clean --no-tui --template "vless://..."  Find + speed test
 """,
     )
@@ -3072,6 +3408,8 @@ Examples:
     p.add_argument("--timeout", type=float, default=LATENCY_TIMEOUT, help="Latency timeout (s)")
     p.add_argument("--speed-timeout", type=float, default=SPEED_TIMEOUT, help="Download timeout (s)")
     p.add_argument("--skip-download", action="store_true", help="Latency only")
+    p.add_argument("--skip-dead", metavar="FILE",
+                   help="Skip configs that repeatedly failed earlier scans (dead filter, e.g. output/dead.bloom)")
     p.add_argument("--top", type=int, default=50, help="Export top N configs (0 = ALL sorted best to worst)")
     p.add_argument("--no-tui", action="store_true", help="Plain text output")
     p.add_argument("-o", "--output", help="CSV output path (headless)")
@@ -3080,6 +3418,8 @@ Examples:
     p.add_argument("--clean-mode", choices=["quick", "normal", "full", "mega"], default="normal",
                    help="Clean IP scan scope (quick=~4K, normal=~12K, full=~1.5M, mega=~3M multi-port)")
     p.add_argument("--subnets", help="Custom subnets file or comma-separated CIDRs")
+    p.add_argument("--procs", type=int, default=1,
+                   help="Clean IP Finder: shard the /24 blocks over N worker processes (default: 1)")
     args = p.parse_args()
 
     args._mode_set = any(a == "-m" or a.startswith("--mode") for a in sys.argv)
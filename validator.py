@@ -0,0 +1,150 @@
+"""
+validator.py — static validity checks for config URIs
+
+ConfigValidator rejects configs that can never connect before they reach
+sub.txt and the scanner: malformed links, broken vmess JSON, bad UUIDs,
+ports outside 1-65535, and loopback / private / reserved / invalid hosts.
+Each rejection gets a reason code, counted per reason and per source and
+optionally logged as "reason<TAB>source<TAB>uri" lines.  With a
+dead_filter.DeadFilter it also rejects configs that repeatedly failed
+local scans ("dead").
+
+All checks are local (no DNS), and host verdicts are cached, since many
+configs share a server, so a check costs a few microseconds on top of the
+identity parse.
+"""
+
+import base64
+import ipaddress
+import json
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Optional
+
+from identity import parse_identity
+
+# reason codes
+MALFORMED = "malformed"
+VMESS_JSON = "vmess_json"
+BAD_UUID = "uuid"
+BAD_PORT = "port"
+HOST_LOOPBACK = "host_loopback"
+HOST_PRIVATE = "host_private"
+HOST_RESERVED = "host_reserved"
+HOST_INVALID = "host_invalid"
+DEAD = "dead"
+
+UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+# Xray also maps any 1-30 byte string to a UUID (custom "id")
+CUSTOM_ID_RE = re.compile(r"^\S{1,30}$")
+HOST_LABEL_RE = re.compile(r"^(?!-)[a-z0-9_-]{1,63}(?<!-)$")
+URL_PORT_RE = re.compile(r"@(?:\[[^\]]*\]|[^:/?#@]*):(\d+)")
+UUID_PROTOCOLS = ("vmess", "vless", "tuic")
+
+
+@lru_cache(maxsize=65536)
+def host_reason(host: str) -> Optional[str]:
+    """Reason code if `host` cannot be a public server, else None."""
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        ip = None
+    if ip is not None:
+        if ip.is_loopback:
+            return HOST_LOOPBACK
+        if ip.is_unspecified or ip.is_multicast or ip.is_reserved:
+            return HOST_RESERVED
+        if ip.is_private or ip.is_link_local or (ip.version == 6 and ip.is_site_local):
+            return HOST_PRIVATE
+        return None
+    if host == "localhost" or host.endswith((".localhost", ".local", ".internal", ".lan")):
+        return HOST_LOOPBACK if "localhost" in host else HOST_PRIVATE
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        return HOST_INVALID
+    labels = host.split(".")
+    if len(labels) < 2 or len(host) > 253 or not all(HOST_LABEL_RE.match(label) for label in labels):
+        return HOST_INVALID
+    if labels[-1].isdigit():
+        return HOST_INVALID  # dotted numbers that are not a valid IPv4 address
+    return None
+
+
+def _vmess_reason(uri: str) -> str:
+    body = uri.partition("://")[2].split("#", 1)[0].strip()
+    body += "=" * (-len(body) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(body) if "-" in body or "_" in body else base64.b64decode(body)
+        obj = json.loads(raw)
+    except Exception:
+        return VMESS_JSON
+    return MALFORMED if isinstance(obj, dict) else VMESS_JSON
+
+
+def _unparsed_reason(uri: str, protocol: str) -> str:
+    if protocol == "vmess":
+        return _vmess_reason(uri)
+    m = URL_PORT_RE.search(uri.split("#", 1)[0])
+    if m and not 0 < int(m.group(1)) < 65536:
+        return BAD_PORT
+    return MALFORMED
+
+
+def check_config(uri: str) -> Optional[str]:
+    """Reason code why `uri` is unusable, or None if it passes every check."""
+    protocol = uri.partition("://")[0].lower()
+    ident = parse_identity(uri)
+    if ident is None:
+        return _unparsed_reason(uri, protocol)
+    if not 0 < ident.port < 65536:
+        return BAD_PORT
+    if ident.protocol in UUID_PROTOCOLS:
+        uid = ident.credential.split(":", 1)[0] if ident.protocol == "tuic" else ident.credential
+        if not (UUID_RE.match(uid) or CUSTOM_ID_RE.match(uid)):
+            return BAD_UUID
+    return host_reason(ident.host)
+
+
+class ConfigValidator:
+    """check_config() plus per-reason / per-source counters and a rejects log."""
+
+    def __init__(self, log_path: Optional[str] = None, dead=None):
+        self.by_reason = Counter()
+        self.by_source = Counter()
+        self.checked = 0
+        self.dead = dead
+        self._log = open(log_path, "w", encoding="utf-8") if log_path else None
+
+    def _record(self, reason: str, uri: str, source: str):
+        self.by_reason[reason] += 1
+        self.by_source[source] += 1
+        if self._log is not None:
+            self._log.write(f"{reason}\t{source}\t{uri}\n")
+
+    def reject(self, uri: str, source: str = "") -> bool:
+        """True (and recorded) if `uri` fails a check."""
+        self.checked += 1
+        reason = check_config(uri)
+        if reason is None:
+            return False
+        self._record(reason, uri, source)
+        return True
+
+    def reject_dead(self, key: str, uri: str, source: str = "") -> bool:
+        """True (and recorded) if identity `key` is dead in the dead filter."""
+        if self.dead is None or not self.dead.is_dead(key):
+            return False
+        self._record(DEAD, uri, source)
+        return True
+
+    def summary(self) -> str:
+        rejected = sum(self.by_reason.values())
+        reasons = ", ".join(f"{r}={n}" for r, n in self.by_reason.most_common())
+        return f"{rejected} rejected" + (f" ({reasons})" if reasons else "") + f", {self.checked} configs checked"
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None